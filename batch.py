@@ -0,0 +1,169 @@
+# batch.py
+# Mode batch offline: proses seluruh folder frame atau video untuk anotasi ulang dataset.
+# Pre-processing jalan paralel di process pool (semua core), beberapa frame digabung jadi
+# satu panggilan FastSAM.predict, dan hasil ditulis bertahap ke JSONL (skema objects_info.json
+# + nama frame), satu baris per frame.
+#
+#   python batch.py Output/frames --out runs/batch/frames.jsonl
+#   python batch.py rekaman.mp4 --stride 5 --batch 8 --out runs/batch/rekaman.jsonl
+
+import os
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from segmentation import (
+    load_image,
+    preprocess_image,
+    extract_objects,
+    model_device,
+    PREPROCESS_PROFILE,
+    MODEL_IMGSZ,
+    LOWRES_MASKS,
+    MAX_DET,
+    SEG_CONF,
+)
+
+# ====== KONFIG ======
+BATCH_SIZE = 8                      # frame per panggilan FastSAM.predict
+WORKERS    = os.cpu_count() or 1    # proses pre-processing
+VIDEO_EXTS = (".mp4", ".avi", ".mov", ".mkv")
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def iter_inputs(source: str, stride: int = 1):
+    """
+    Yield (nama, path atau frame) dari folder gambar atau file video.
+    Folder: path dikirim ke worker (gambar dibaca di worker, tanpa pickle frame besar).
+    """
+    if os.path.isdir(source):
+        names = sorted(n for n in os.listdir(source) if n.lower().endswith(IMAGE_EXTS))
+        for name in names[::stride]:
+            yield name, os.path.join(source, name)
+        return
+    if not source.lower().endswith(VIDEO_EXTS):
+        raise ValueError(f"Input harus folder gambar atau video {VIDEO_EXTS}: {source}")
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise RuntimeError(f"Tidak bisa membuka video: {source}")
+    base = os.path.splitext(os.path.basename(source))[0]
+    idx = 0
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if idx % stride == 0:
+                yield f"{base}_{idx:06d}", frame
+            idx += 1
+    finally:
+        cap.release()
+
+
+def _init_worker():
+    # Satu proses per core: thread OpenCV di dalam worker hanya bikin oversubscription
+    cv2.setNumThreads(1)
+
+
+def _preprocess_job(job):
+    """Worker: baca (jika path) + pre-process. Return (nama, (H, W) frame asli, gambar input model)."""
+    name, image, profile = job
+    frame = load_image(image)
+    input_img = frame if profile == "off" else preprocess_image(frame, profile=profile)
+    return name, frame.shape[:2], input_img
+
+
+def preprocessed(inputs, profile: str, workers: int, backlog: int):
+    """Pre-process paralel dengan jumlah job in-flight terbatas; urutan frame dipertahankan."""
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = deque()
+        for name, image in inputs:
+            pending.append(pool.submit(_preprocess_job, (name, image, profile)))
+            if len(pending) >= backlog:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def batched(items, size: int):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_batch(source: str, out_path: str, batch_size: int = BATCH_SIZE, workers: int = WORKERS,
+              profile: str = PREPROCESS_PROFILE, stride: int = 1, model=None) -> dict:
+    """Proses seluruh input; return ringkasan (frame, objek, durasi, fps)."""
+    if model is None:
+        from model_pool import get_pool
+        model = get_pool().get("fastsam")
+    device = model_device(model)
+    if getattr(model, "seg_backend", "torch") != "torch" and batch_size > 1:
+        # Graph ONNX di-export statis dengan batch 1
+        print(f"[Batch] Backend {model.seg_backend}: batch {batch_size} -> 1 (ONNX batch tetap)")
+        batch_size = 1
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    n_frames = n_objects = 0
+    t0 = time.perf_counter()
+    stream = preprocessed(iter_inputs(source, stride), profile, workers, backlog=workers * 2 + batch_size)
+    with open(out_path, "w", encoding="utf-8") as f:
+        for batch in batched(stream, batch_size):
+            results = model.predict(
+                source=[img for _, _, img in batch],
+                imgsz=MODEL_IMGSZ,
+                conf=SEG_CONF,
+                iou=0.7,
+                retina_masks=not LOWRES_MASKS,
+                max_det=MAX_DET,
+                device=device,
+                save=False,
+                verbose=False,
+            )
+            for (name, (H, W), input_img), r in zip(batch, results):
+                objects, _, _ = extract_objects(r, W, H, W / input_img.shape[1])
+                f.write(json.dumps({
+                    "frame": name,
+                    "segmented_image_path": None,
+                    "bbox_image_path": None,
+                    "objects": objects,
+                }) + "\n")
+                n_objects += len(objects)
+            f.flush()
+            n_frames += len(batch)
+            dt = time.perf_counter() - t0
+            print(f"[Batch] {n_frames} frame | {n_objects} objek | {n_frames / dt:.2f} frame/s")
+
+    dt = time.perf_counter() - t0
+    summary = {"frames": n_frames, "objects": n_objects, "seconds": round(dt, 2),
+               "fps": round(n_frames / dt, 3) if dt else 0.0, "out": out_path}
+    print(f"✓ Selesai: {n_frames} frame dalam {dt:.1f}s ({summary['fps']:.2f} frame/s) -> {out_path}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Segmentasi batch folder frame / video ke JSONL")
+    parser.add_argument("source", help="Folder gambar atau file video")
+    parser.add_argument("--out", default=None, help="File JSONL (default: runs/batch/<nama>.jsonl)")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="Frame per panggilan predict")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Proses pre-processing")
+    parser.add_argument("--profile", default=PREPROCESS_PROFILE, choices=("off", "fast", "quality", "auto"))
+    parser.add_argument("--stride", type=int, default=1, help="Ambil setiap frame ke-N")
+    args = parser.parse_args()
+
+    out = args.out or os.path.join(
+        "runs", "batch", os.path.splitext(os.path.basename(os.path.normpath(args.source)))[0] + ".jsonl")
+    run_batch(args.source, out, max(1, args.batch), max(1, args.workers), args.profile, max(1, args.stride))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,750 @@
+# bench.py
+# Benchmark offline untuk tahap-tahap pipeline.
+#
+#   python bench.py preprocess --frames Output/frames [--segment]
+#   python bench.py nms [--sizes 25 50 100 200]
+#   python bench.py triggers [--count 50]
+#   python bench.py text [--rules 25 100 500]
+#   python bench.py replay --frames Output/frames --backend stub [--stream] [--compare lama.json]
+#   python bench.py backends --frames Output/frames [--backends torch onnx onnx-int8]
+#   python bench.py threads --frames Output/frames [--torch 1 2 4 --opencv 1 2 --piper 1 2 --argos 1 2]
+#   python bench.py payload --frames Output/frames [--formats jpeg webp --quality 70 85 --roi]
+
+import os
+import glob
+import json
+import time
+import argparse
+import statistics
+
+FRAMES_DIR = os.path.join("Output", "frames")
+
+
+def list_frames(frames_dir: str) -> list:
+    paths = []
+    for ext in ("*.jpg", "*.jpeg", "*.png"):
+        paths.extend(glob.glob(os.path.join(frames_dir, ext)))
+    return sorted(paths)
+
+
+def percentile(values, q: float) -> float:
+    """Persentil (0-100) dengan interpolasi linear."""
+    if not values:
+        return 0.0
+    xs = sorted(values)
+    k = (len(xs) - 1) * q / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+
+def summarize(values) -> dict:
+    """Ringkasan distribusi latency (ms)."""
+    if not values:
+        return {"n": 0}
+    return {
+        "n": len(values),
+        "mean_ms": round(statistics.fmean(values), 3),
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "max_ms": round(max(values), 3),
+    }
+
+
+def save_json(path: str, data: dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    print(f"✓ Hasil disimpan: {path}")
+
+
+# ===== PRE-PROCESSING =====
+def bench_preprocess(args):
+    """Waktu tiap profile pre-processing + (opsional) efek ke jumlah objek terdeteksi."""
+    import cv2
+    from segmentation import preprocess_image, segment_objects, PREPROCESS_PROFILES
+
+    frames = list_frames(args.frames)[: args.limit or None]
+    if not frames:
+        print(f"Tidak ada frame di {args.frames}")
+        return
+    images = [cv2.imread(p) for p in frames]
+
+    report = {}
+    for profile in PREPROCESS_PROFILES:
+        times, counts = [], []
+        for img in images:
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                preprocess_image(img, profile=profile)
+                times.append((time.perf_counter() - t0) * 1000)
+            if args.segment:
+                seg = segment_objects(img, profile=profile, save_debug=False)
+                counts.append(len(seg["objects"]))
+        report[profile] = summarize(times)
+        if counts:
+            report[profile]["objects_mean"] = round(statistics.fmean(counts), 2)
+            report[profile]["objects_per_frame"] = counts
+
+    print(f"\n=== PRE-PROCESSING ({len(images)} frame, repeat {args.repeat}) ===")
+    for profile, r in report.items():
+        line = f"{profile:8s}: p50 {r['p50_ms']:9.2f} ms | p95 {r['p95_ms']:9.2f} ms"
+        if "objects_mean" in r:
+            line += f" | objek rata-rata {r['objects_mean']:.2f}"
+        print(line)
+
+    if args.out:
+        save_json(args.out, {"bench": "preprocess", "frames": len(images), "profiles": report})
+
+
+# ===== NMS =====
+def _nms_loop(cand, iou_thresh, top_k):
+    """NMS lama (Python murni, O(n^2) panggilan iou()) sebagai pembanding."""
+    from segmentation import iou
+    cand = sorted(cand, key=lambda x: (x[0], x[1]), reverse=True)
+    kept = []
+    for c in cand:
+        if all(iou(c[2], k[2]) < iou_thresh for k in kept):
+            kept.append(c)
+    return kept[:top_k]
+
+
+def _synthetic_candidates(n, rng, W=1280, H=720):
+    """Kandidat acak (box + mask persegi) yang saling overlap seperti output FastSAM."""
+    import numpy as np
+    masks = np.zeros((n, H, W), dtype=np.uint8)
+    cand = []
+    for i in range(n):
+        w, h = int(rng.integers(60, 500)), int(rng.integers(60, 400))
+        x1, y1 = int(rng.integers(0, W - w)), int(rng.integers(0, H - h))
+        masks[i, y1:y1 + h, x1:x1 + w] = 1
+        cand.append((float(rng.random()), w * h, (x1, y1, x1 + w, y1 + h), i))
+    return cand, masks
+
+
+def bench_nms(args):
+    """Microbenchmark NMS: loop lama vs vektor (box) vs vektor (mask)."""
+    import numpy as np
+    from segmentation import nms, NMS_IOU, TOP_K
+
+    rng = np.random.default_rng(0)
+    report = {}
+    print(f"\n=== NMS (repeat {args.repeat}) ===")
+    for n in args.sizes:
+        cand, masks = _synthetic_candidates(n, rng)
+        runs = {
+            "loop": lambda: _nms_loop(cand, NMS_IOU, TOP_K),
+            "box": lambda: nms(cand, masks, mode="box"),
+            "mask": lambda: nms(cand, masks, mode="mask"),
+        }
+        row = {}
+        for name, fn in runs.items():
+            times = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                fn()
+                times.append((time.perf_counter() - t0) * 1000)
+            row[name] = summarize(times)
+        row["box_matches_loop"] = runs["box"]() == runs["loop"]()
+        report[n] = row
+        print(f"n={n:4d}: loop {row['loop']['p50_ms']:8.3f} ms | box {row['box']['p50_ms']:8.3f} ms "
+              f"| mask {row['mask']['p50_ms']:8.3f} ms | speedup box "
+              f"{row['loop']['p50_ms'] / max(1e-9, row['box']['p50_ms']):6.1f}x "
+              f"| hasil sama: {row['box_matches_loop']}")
+
+    if args.out:
+        save_json(args.out, {"bench": "nms", "sizes": report})
+
+
+# ===== TRIGGER =====
+def bench_triggers(args):
+    """Latency trigger -> loop utama bangun: TriggerHub (event) vs polling sleep(0.1) lama."""
+    import threading
+    from triggers import TriggerHub, ReplayTrigger
+
+    schedule = [args.interval] * args.count
+
+    # Event-driven (TriggerHub.wait)
+    hub = TriggerHub(debounce_sec=0.0)
+    ReplayTrigger(schedule).start(hub)
+    event_lat = []
+    while True:
+        ev = hub.wait()
+        if ev is None:
+            break
+        event_lat.append((time.perf_counter() - ev.t) * 1000)
+
+    # Polling lama: flag + time.sleep(0.1)
+    state = {"t": None, "done": False}
+
+    def fire_loop():
+        for delay in schedule:
+            time.sleep(delay)
+            state["t"] = time.perf_counter()
+        state["done"] = True
+
+    threading.Thread(target=fire_loop, daemon=True).start()
+    poll_lat = []
+    while not state["done"] or state["t"] is not None:
+        if state["t"] is not None:
+            poll_lat.append((time.perf_counter() - state["t"]) * 1000)
+            state["t"] = None
+        time.sleep(0.1)
+
+    report = {"event": summarize(event_lat), "polling_100ms": summarize(poll_lat)}
+    print(f"\n=== TRIGGER -> START ({args.count} trigger) ===")
+    for name, r in report.items():
+        print(f"{name:14s}: p50 {r['p50_ms']:8.3f} ms | p95 {r['p95_ms']:8.3f} ms | max {r['max_ms']:8.3f} ms")
+    if args.out:
+        save_json(args.out, {"bench": "triggers", "results": report})
+
+
+# ===== TEKS =====
+SAMPLE_EN = [
+    "A city street with a pedestrian crossing in the foreground, featuring white stripes and a 'Wideway' sign. "
+    "On the left side, there is a person standing on the sidewalk, while on the right side, a car is parked at the curb. "
+    "The traffic lights are located ahead of the intersection, indicating that it's safe for pedestrians to cross.",
+    "1. Object 1: A wooden chair is located ahead. 2. Object 2: A table is on the right side.",
+    "There is a staircase in the foreground with a metal handrail on the left.",
+]
+SAMPLE_ID = [
+    "jalan kota dengan pejalan kaki menyeberang di depan anda, menampilkan garis putih dan tanda \"wideway\", "
+    "sementara di sisi kiri seseorang berdiri di trotoar, sementara di sebelah kanan mobil diparkir di sisi kanan di sisi kanan. "
+    "lampu lalu lintas terletak di depan persimpangan, lampu mengatakan aman untuk menyeberang.",
+    "kursi kayu ada di depan, meja terletak di sisi kanan.",
+    "tangga di depan anda dengan pegangan logam di sebelah kiri.",
+]
+
+
+def _replace_loop(rules, text: str) -> str:
+    """Cara lama: str.replace berurutan + while '  ' in t (pembanding)."""
+    for src, dst in rules:
+        if src in text:
+            text = text.replace(src, dst)
+    while "  " in text:
+        text = text.replace("  ", " ")
+    return text
+
+
+def _padded_rules(rules, n: int):
+    """Tabel aturan diperbesar sampai n entri dengan frasa sintetis yang tidak pernah cocok."""
+    extra = [(f"frasa sintetis nomor {i} tidak muncul", f"pengganti {i}") for i in range(max(0, n - len(rules)))]
+    return list(rules) + extra
+
+
+def _time_calls(fn, texts, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        for text in texts:
+            t0 = time.perf_counter()
+            fn(text)
+            times.append((time.perf_counter() - t0) * 1000)
+    return summarize(times)
+
+
+def bench_text(args):
+    """Microbenchmark tahap teks: normalize EN, polish ID, clean_output_for_tts; loop lama vs single-pass."""
+    from text_rules import RewriteRules, EN_NORMALIZE_RULES, ID_POLISH_RULES, ID_SPLIT_RULES, collapse_spaces
+    from translator_argos import normalize_en_for_translate, _polish_indonesian_for_tts
+    from test import clean_output_for_tts
+
+    stages = {
+        "normalize_en": _time_calls(normalize_en_for_translate, SAMPLE_EN, args.repeat),
+        "polish_id": _time_calls(_polish_indonesian_for_tts, SAMPLE_ID, args.repeat),
+        "clean_output": _time_calls(clean_output_for_tts, SAMPLE_EN, args.repeat),
+    }
+    print(f"\n=== TAHAP TEKS (repeat {args.repeat}) ===")
+    for name, r in stages.items():
+        print(f"{name:14s}: p50 {r['p50_ms'] * 1000:8.1f} us | p95 {r['p95_ms'] * 1000:8.1f} us")
+
+    scaling = {}
+    print("\n=== POLISH ID: JUMLAH ATURAN ===")
+    for n in args.rules:
+        rules = _padded_rules(ID_POLISH_RULES, n)
+        engine, split = RewriteRules(rules), RewriteRules(ID_SPLIT_RULES)
+        texts = [t.lower() for t in SAMPLE_ID]
+        row = {
+            "rules": len(rules),
+            "loop": _time_calls(lambda t: _replace_loop(rules + ID_SPLIT_RULES, t), texts, args.repeat),
+            "single_pass": _time_calls(lambda t: collapse_spaces(split.apply(engine.apply(t))), texts, args.repeat),
+        }
+        scaling[n] = row
+        print(f"rules={len(rules):4d}: loop {row['loop']['p50_ms'] * 1000:8.1f} us | "
+              f"single-pass {row['single_pass']['p50_ms'] * 1000:8.1f} us")
+
+    if args.out:
+        save_json(args.out, {"bench": "text", "stages": stages, "scaling": scaling,
+                             "en_rules": len(EN_NORMALIZE_RULES)})
+
+
+# ===== REPLAY END-TO-END =====
+STUB_ANSWER = ("A wooden chair is ahead on the left side. A person is standing on the right side "
+               "near a parked car. Keep safe distance.")
+
+
+def stub_tokens(text: str = STUB_ANSWER, token_rate: float = 30.0, first_token: float = 0.5):
+    """Pengganti stream Moondream: token (kata) dengan jeda prefill + laju token tetap."""
+    time.sleep(first_token)
+    words = text.split(" ")
+    for i, w in enumerate(words):
+        if i:
+            time.sleep(1.0 / token_rate)
+        yield w if i == 0 else " " + w
+
+
+def peak_rss_mb():
+    """Peak RSS proses (MB); None jika modul resource tidak ada (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    import sys
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _replay_frame(img, name, args, tracer):
+    """Satu frame: segment -> prompt -> VLM -> clean -> translate -> TTS, semua sebagai span."""
+    from segmentation import segment_objects
+    from test import (build_prompt, build_segments_info, query_ollama_vision,
+                      stream_ollama_vision, clean_output_for_tts, MODEL_NAME)
+    from image_payload import encode_payload, crop_objects
+    from translator_argos import translate_id
+    from tts_piper import synthesize_id
+    from streaming import stream_describe_and_speak
+    from tracing import span
+
+    root = tracer.start_span("replay.frame", frame=name)
+    with span("segmentation", parent=root):
+        seg = segment_objects(img, save_debug=False)
+    seg_img = seg.get("segmented_image")
+    seg_img = img if seg_img is None else seg_img
+    objects = seg.get("objects", [])
+    with span("encode_image", parent=root) as sp:
+        img_b64, payload = encode_payload(seg_img, objects)
+        sp.set(bytes=payload["bytes"], format=payload["format"])
+    with span("build_prompt", parent=root):
+        # Posisi objek relatif ke gambar yang dikirim (crop ROI jika ada)
+        if payload["roi"] is not None:
+            objects_prompt = crop_objects(objects, payload["roi"])
+        else:
+            objects_prompt = objects
+        prompt = build_prompt(build_segments_info(objects_prompt) if objects else "")
+
+    stub = lambda: stub_tokens(token_rate=args.token_rate, first_token=args.first_token)
+    if args.stream:
+        tokens = stub() if args.backend == "stub" else stream_ollama_vision(MODEL_NAME, prompt, img_b64)
+        with span("stream", parent=root):
+            out = stream_describe_and_speak(prompt, img_b64, MODEL_NAME, tokens=tokens,
+                                            t_start=root.start_ns / 1e9)
+        for mark in ("first_token", "first_sentence", "vlm_done"):
+            if mark in out["timing"]:
+                tracer.record(mark, out["timing"][mark], parent=root)
+        ttfa = out["timing"].get("first_audio")
+    else:
+        with span("moondream_inference", parent=root):
+            if args.backend == "stub":
+                en_raw = "".join(stub())
+            else:
+                en_raw = query_ollama_vision(MODEL_NAME, prompt, img_b64)
+        with span("clean_output", parent=root):
+            en = clean_output_for_tts(en_raw)
+        with span("translation", parent=root):
+            text_id = translate_id(en)
+        with span("tts", parent=root):
+            synthesize_id(text_id)
+        # Mode serial: audio baru bisa diputar setelah seluruh TTS selesai
+        ttfa = (time.perf_counter_ns() - root.start_ns) / 1e9
+    if ttfa is not None:
+        tracer.record("ttfa", ttfa, parent=root)
+    root.end()
+    return len(objects)
+
+
+def compare_reports(base: dict, new: dict, threshold: float) -> list:
+    """Bandingkan dua hasil replay (p50/p95 per span). Return daftar span yang regresi."""
+    regressions = []
+    print(f"\n=== PERBANDINGAN (ambang regresi {threshold:.0f}%) ===")
+    for name, r in new["stages"].items():
+        b = base.get("stages", {}).get(name)
+        if b is None:
+            continue
+        parts = []
+        for key in ("p50_ms", "p95_ms"):
+            delta = (r[key] - b[key]) / b[key] * 100 if b[key] else 0.0
+            parts.append(f"{key[:3]} {b[key]:9.1f} -> {r[key]:9.1f} ms ({delta:+6.1f}%)")
+            if delta > threshold and r[key] - b[key] > 1.0:
+                regressions.append(name)
+        flag = "  <-- REGRESI" if name in regressions else ""
+        print(f"{name:22s}: " + " | ".join(parts) + flag)
+    if base.get("throughput_fps") and new.get("throughput_fps"):
+        print(f"{'throughput':22s}: {base['throughput_fps']:.3f} -> {new['throughput_fps']:.3f} frame/s")
+    return sorted(set(regressions))
+
+
+def bench_replay(args):
+    """Replay folder frame lewat pipeline lengkap; distribusi per tahap, throughput, peak RSS, TTFA."""
+    import cv2
+    from model_pool import get_pool
+    from tracing import get_tracer
+
+    frames = list_frames(args.frames)[: args.limit or None]
+    if not frames:
+        print(f"Tidak ada frame di {args.frames}")
+        return
+    pool = get_pool()
+    pool.preload()
+    tracer = get_tracer()
+
+    # Cache terjemahan/TTS: "off" (default) -> setiap frame benar-benar translate + sintesis;
+    # "cold" -> cache memori kosong di awal. Store disk tidak pernah dipakai, jadi hasil tidak
+    # bergantung pada isi runs/cache dari run sebelumnya.
+    from translator_argos import reset_translation_cache
+    reset_translation_cache(enabled=args.caches == "cold", db_path=None)
+    pool.get("piper").reset_cache(enabled=args.caches == "cold", cache_dir=None)
+
+    # Frame warm-up tidak dihitung (alokasi CUDA, cache pertama, dsb.)
+    for path in frames[: args.warmup]:
+        _replay_frame(cv2.imread(path), os.path.basename(path), args, tracer)
+    tracer.reset()
+
+    objects = []
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        for path in frames:
+            objects.append(_replay_frame(cv2.imread(path), os.path.basename(path), args, tracer))
+    wall = time.perf_counter() - t0
+
+    stages = tracer.aggregate()
+    report = {
+        "bench": "replay",
+        "config": {"frames_dir": args.frames, "backend": args.backend, "stream": args.stream,
+                   "token_rate": args.token_rate if args.backend == "stub" else None,
+                   "first_token": args.first_token if args.backend == "stub" else None,
+                   "warmup": args.warmup, "repeat": args.repeat, "caches": args.caches},
+        "frames": len(objects),
+        "wall_s": round(wall, 3),
+        "throughput_fps": round(len(objects) / wall, 3) if wall else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "objects_mean": round(statistics.fmean(objects), 2) if objects else 0.0,
+        "ttfa": stages.get("ttfa", {"n": 0}),
+        "stages": stages,
+    }
+
+    print(f"\n=== REPLAY ({len(objects)} frame, backend {args.backend}, "
+          f"{'stream' if args.stream else 'serial'}) ===")
+    tracer.print_summary()
+    print(f"Throughput : {report['throughput_fps']:.3f} frame/s ({wall:.1f}s)")
+    print(f"Peak RSS   : {report['peak_rss_mb']} MB")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["regressions"] = compare_reports(json.load(f), report, args.threshold)
+    if args.out:
+        save_json(args.out, report)
+
+
+# ===== BACKEND SEGMENTASI =====
+def _match_objects(ref: list, got: list) -> dict:
+    """Paritas satu frame: selisih jumlah objek, IoU rata-rata pasangan terbaik, posisi sama."""
+    import numpy as np
+    from segmentation import box_iou_matrix
+    if not ref or not got:
+        return {"count_diff": len(got) - len(ref), "mean_iou": 1.0 if not ref and not got else 0.0,
+                "position_match": 1.0 if not ref and not got else 0.0}
+    boxes = [o["bbox"] for o in ref] + [o["bbox"] for o in got]
+    ious = box_iou_matrix(boxes)[: len(ref), len(ref):]
+    best = ious.argmax(axis=1)
+    same_pos = [ref[i]["h_position"] == got[j]["h_position"] and ref[i]["v_position"] == got[j]["v_position"]
+                for i, j in enumerate(best)]
+    return {"count_diff": len(got) - len(ref), "mean_iou": float(ious.max(axis=1).mean()),
+            "position_match": float(np.mean(same_pos))}
+
+
+def bench_backends(args):
+    """Paritas + kecepatan segment_objects per backend FastSAM (torch / onnx / onnx-int8)."""
+    import cv2
+    from segmentation import segment_objects, load_fastsam, model_device
+
+    frames = list_frames(args.frames)[: args.limit or None]
+    if not frames:
+        print(f"Tidak ada frame di {args.frames}")
+        return
+    images = [cv2.imread(p) for p in frames]
+
+    outputs, report = {}, {}
+    for backend in args.backends:
+        t0 = time.perf_counter()
+        model = load_fastsam(backend)
+        print(f"[{backend}] device: {model_device(model)}")
+        segment_objects(images[0], model=model, save_debug=False)   # warm-up
+        load_s = time.perf_counter() - t0
+        times, objs = [], []
+        for img in images:
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                seg = segment_objects(img, model=model, save_debug=False)
+                times.append((time.perf_counter() - t0) * 1000)
+            objs.append(seg["objects"])
+        outputs[backend] = objs
+        report[backend] = dict(summarize(times), load_warmup_s=round(load_s, 2))
+        del model
+
+    ref_name = args.backends[0]
+    for backend in args.backends[1:]:
+        rows = [_match_objects(r, g) for r, g in zip(outputs[ref_name], outputs[backend])]
+        report[backend]["parity_vs_" + ref_name] = {
+            "mean_iou": round(statistics.fmean(r["mean_iou"] for r in rows), 3),
+            "position_match": round(statistics.fmean(r["position_match"] for r in rows), 3),
+            "count_exact": round(statistics.fmean(r["count_diff"] == 0 for r in rows), 3),
+        }
+
+    print(f"\n=== BACKEND FASTSAM ({len(images)} frame, repeat {args.repeat}) ===")
+    for backend, r in report.items():
+        line = f"{backend:10s}: p50 {r['p50_ms']:9.1f} ms | p95 {r['p95_ms']:9.1f} ms"
+        par = r.get("parity_vs_" + ref_name)
+        if par:
+            line += (f" | IoU {par['mean_iou']:.3f} | posisi sama {par['position_match']:.0%} "
+                     f"| jumlah objek sama {par['count_exact']:.0%}")
+        print(line)
+    if args.out:
+        save_json(args.out, {"bench": "backends", "frames": len(images), "reference": ref_name,
+                             "backends": report})
+
+
+# ===== BUDGET THREAD =====
+def _thread_workload(images, model, translator, engine, concurrent: bool) -> dict:
+    """
+    Beban yang mirip executor: segmentasi semua frame (tahap segment) bersamaan dengan
+    translate + TTS kalimat contoh (tahap stream). Cache terjemahan/PCM dilewati.
+    """
+    import threading
+    from segmentation import segment_objects
+
+    seg_ms, speak_ms = [], []
+
+    def segment_all():
+        for img in images:
+            t0 = time.perf_counter()
+            segment_objects(img, model=model, save_debug=False)
+            seg_ms.append((time.perf_counter() - t0) * 1000)
+
+    def speak_all():
+        for _ in images:
+            for en in SAMPLE_EN:
+                t0 = time.perf_counter()
+                engine._synthesize_raw(translator.translate(en))
+                speak_ms.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    if concurrent:
+        threads = [threading.Thread(target=segment_all), threading.Thread(target=speak_all)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    else:
+        segment_all()
+        speak_all()
+    return {"wall_s": round(time.perf_counter() - t0, 3),
+            "segment": summarize(seg_ms), "translate_tts": summarize(speak_ms)}
+
+
+def bench_threads(args):
+    """Sweep budget thread torch/OpenCV/Piper/Argos pada beban bersamaan; laporkan pembagian terbaik."""
+    import itertools
+    import cv2
+    from model_pool import get_pool
+    from resources import apply_thread_budget
+
+    frames = list_frames(args.frames)[: args.limit or None]
+    if not frames:
+        print(f"Tidak ada frame di {args.frames}")
+        return
+    images = [cv2.imread(p) for p in frames]
+    cores = os.cpu_count() or 1
+    pool = get_pool()
+    model, engine, translator = pool.get("fastsam"), pool.get("piper"), pool.get("argos")
+
+    def run(alloc, concurrent=True):
+        apply_thread_budget(alloc)
+        engine.set_threads(alloc["piper"])
+        # Translator CTranslate2 dibangun langsung; reload lewat pool bisa memakai ulang
+        # translator lama dari cache get_installed_languages() argostranslate
+        translator.set_threads(alloc["argos"])
+        return _thread_workload(images, model, translator, engine, concurrent)
+
+    # Acuan: setiap engine memakai semua core (perilaku default library)
+    default = {"torch": cores, "opencv": cores, "piper": cores, "argos": cores}
+    results = [dict(alloc=default, label="default", **run(default)),
+               dict(alloc=default, label="default-serial", **run(default, concurrent=False))]
+    for t, o, p, a in itertools.product(args.torch, args.opencv, args.piper, args.argos):
+        alloc = {"torch": t, "opencv": o, "piper": p, "argos": a}
+        results.append(dict(alloc=alloc, label=f"t{t} o{o} p{p} a{a}", **run(alloc)))
+
+    print(f"\n=== BUDGET THREAD ({len(images)} frame, {cores} core) ===")
+    for r in sorted(results, key=lambda r: r["wall_s"]):
+        print(f"{r['label']:16s}: wall {r['wall_s']:7.2f}s | segment p50 {r['segment']['p50_ms']:8.1f} ms "
+              f"| translate+tts p50 {r['translate_tts']['p50_ms']:8.1f} ms")
+    best = min((r for r in results if r["label"] != "default-serial"), key=lambda r: r["wall_s"])
+    print("Terbaik: VISION_THREADS=\"" + ",".join(f"{k}={v}" for k, v in best["alloc"].items()) + "\"")
+    if args.out:
+        save_json(args.out, {"bench": "threads", "frames": len(images), "cores": cores,
+                             "best": best["alloc"], "results": results})
+
+
+def _png_baseline(img):
+    """Payload lama: PNG lossless resolusi penuh."""
+    import base64
+    import cv2
+    t0 = time.perf_counter()
+    ok, buf = cv2.imencode(".png", img)
+    b64 = base64.b64encode(buf).decode("utf-8")
+    return b64, {"bytes": int(buf.size), "encode_ms": (time.perf_counter() - t0) * 1000}
+
+
+def _decode_ms(b64: str) -> float:
+    """Perkiraan biaya decode di sisi server: base64 -> imdecode."""
+    import base64
+    import cv2
+    import numpy as np
+    t0 = time.perf_counter()
+    cv2.imdecode(np.frombuffer(base64.b64decode(b64), np.uint8), cv2.IMREAD_COLOR)
+    return (time.perf_counter() - t0) * 1000
+
+
+def bench_payload(args):
+    """Ukuran + waktu encode/decode payload gambar VLM: PNG penuh vs resize + JPEG/WebP (+ ROI)."""
+    import cv2
+    from image_payload import encode_payload
+
+    frames = list_frames(args.frames)[: args.limit or None]
+    if not frames:
+        print(f"Tidak ada frame di {args.frames}")
+        return
+    images = []
+    for path in frames:
+        img, objects = cv2.imread(path), []
+        if args.segment:
+            from segmentation import segment_objects
+            seg = segment_objects(img, save_debug=False)
+            objects = seg.get("objects", [])
+            img = img if seg.get("segmented_image") is None else seg["segmented_image"]
+        images.append((img, objects))
+
+    configs = [("png-full", lambda img, objects: _png_baseline(img))]
+    for fmt in args.formats:
+        for q in args.quality:
+            configs.append((f"{fmt}-q{q}-{args.size}",
+                            lambda img, objects, fmt=fmt, q=q: encode_payload(img, fmt=fmt, quality=q,
+                                                                              size=args.size, roi=False)))
+            if args.roi:
+                configs.append((f"{fmt}-q{q}-{args.size}-roi",
+                                lambda img, objects, fmt=fmt, q=q: encode_payload(img, objects, fmt=fmt, quality=q,
+                                                                                  size=args.size, roi=True)))
+
+    results = {}
+    for label, fn in configs:
+        sizes, enc_ms, dec_ms = [], [], []
+        for _ in range(args.repeat):
+            for img, objects in images:
+                b64, info = fn(img, objects)
+                sizes.append(len(b64))
+                enc_ms.append(info["encode_ms"])
+                dec_ms.append(_decode_ms(b64))
+        results[label] = {"b64_kb_mean": round(statistics.fmean(sizes) / 1024, 1),
+                          "encode": summarize(enc_ms), "decode": summarize(dec_ms)}
+
+    base_kb = results["png-full"]["b64_kb_mean"]
+    print(f"\n=== PAYLOAD GAMBAR ({len(images)} frame) ===")
+    for label, r in results.items():
+        print(f"{label:22s}: {r['b64_kb_mean']:8.1f} KB base64 ({r['b64_kb_mean'] / base_kb * 100:5.1f}%) "
+              f"| encode p50 {r['encode']['p50_ms']:6.2f} ms | decode p50 {r['decode']['p50_ms']:6.2f} ms")
+    if args.out:
+        save_json(args.out, {"bench": "payload", "frames": len(images), "size": args.size,
+                             "segment": args.segment, "results": results})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline Vision Assist")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("preprocess", help="Bandingkan profile pre-processing")
+    p.add_argument("--frames", default=FRAMES_DIR)
+    p.add_argument("--limit", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--segment", action="store_true", help="Jalankan FastSAM untuk hitung objek per profile")
+    p.add_argument("--out", default=None, help="Simpan hasil ke JSON")
+    p.set_defaults(func=bench_preprocess)
+
+    p = sub.add_parser("nms", help="Microbenchmark NMS lama vs vektor")
+    p.add_argument("--sizes", type=int, nargs="+", default=[25, 50, 100, 200])
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--out", default=None)
+    p.set_defaults(func=bench_nms)
+
+    p = sub.add_parser("triggers", help="Latency trigger -> mulai pipeline (event vs polling)")
+    p.add_argument("--count", type=int, default=30)
+    p.add_argument("--interval", type=float, default=0.137)
+    p.add_argument("--out", default=None)
+    p.set_defaults(func=bench_triggers)
+
+    p = sub.add_parser("text", help="Microbenchmark cleaning/normalize/polish teks")
+    p.add_argument("--rules", type=int, nargs="+", default=[25, 100, 500])
+    p.add_argument("--repeat", type=int, default=200)
+    p.add_argument("--out", default=None)
+    p.set_defaults(func=bench_text)
+
+    p = sub.add_parser("replay", help="Replay folder frame lewat pipeline lengkap (end-to-end)")
+    p.add_argument("--frames", default=FRAMES_DIR)
+    p.add_argument("--limit", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=1)
+    p.add_argument("--warmup", type=int, default=1, help="Jumlah frame awal yang tidak dihitung")
+    p.add_argument("--backend", choices=("ollama", "stub"), default="ollama")
+    p.add_argument("--token-rate", type=float, default=30.0, help="Token/detik backend stub")
+    p.add_argument("--first-token", type=float, default=0.5, help="Jeda token pertama backend stub (detik)")
+    p.add_argument("--stream", action="store_true", help="Pakai mode streaming (TTFA per kalimat)")
+    p.add_argument("--caches", choices=("off", "cold"), default="off",
+                   help="Cache terjemahan/TTS: off, atau cold (memori saja, kosong di awal)")
+    p.add_argument("--compare", default=None, help="JSON hasil replay sebelumnya untuk dibandingkan")
+    p.add_argument("--threshold", type=float, default=10.0, help="Ambang regresi (%%)")
+    p.add_argument("--out", default=None)
+    p.set_defaults(func=bench_replay)
+
+    p = sub.add_parser("backends", help="Paritas + kecepatan backend FastSAM (torch/onnx/onnx-int8)")
+    p.add_argument("--frames", default=FRAMES_DIR)
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--repeat", type=int, default=1)
+    p.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"],
+                   help="Backend pertama dipakai sebagai acuan paritas")
+    p.add_argument("--out", default=None)
+    p.set_defaults(func=bench_backends)
+
+    p = sub.add_parser("threads", help="Sweep budget thread per engine (torch/OpenCV/Piper/Argos)")
+    p.add_argument("--frames", default=FRAMES_DIR)
+    p.add_argument("--limit", type=int, default=10)
+    p.add_argument("--torch", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--opencv", type=int, nargs="+", default=[1, 2])
+    p.add_argument("--piper", type=int, nargs="+", default=[1, 2])
+    p.add_argument("--argos", type=int, nargs="+", default=[1, 2])
+    p.add_argument("--out", default=None)
+    p.set_defaults(func=bench_threads)
+
+    p = sub.add_parser("payload", help="Ukuran + encode/decode payload gambar VLM (PNG vs JPEG/WebP)")
+    p.add_argument("--frames", default=FRAMES_DIR)
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--formats", nargs="+", choices=("jpeg", "webp", "png"), default=["jpeg", "webp"])
+    p.add_argument("--quality", type=int, nargs="+", default=[70, 85, 95])
+    p.add_argument("--size", type=int, default=378, help="Sisi terpanjang payload")
+    p.add_argument("--segment", action="store_true", help="Pakai gambar tersegmentasi FastSAM (perlu untuk --roi)")
+    p.add_argument("--roi", action="store_true", help="Tambahkan varian crop ke union bbox objek")
+    p.add_argument("--out", default=None)
+    p.set_defaults(func=bench_payload)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# cache_store.py
+# Komponen cache bersama: LRU in-memory (dengan TTL / batas byte) dan key-value SQLite
+# untuk penyimpanan yang bertahan setelah restart.
+
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    LRU thread-safe.
+
+    Args:
+        maxsize: jumlah entri maksimum (None = tanpa batas jumlah)
+        ttl: umur maksimum entri dalam detik (None = tidak kedaluwarsa)
+        max_bytes: total ukuran maksimum (butuh sizeof)
+        sizeof: fungsi ukuran value dalam byte
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = None, max_bytes: int = None, sizeof=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda v: 0)
+        self._data = OrderedDict()  # key -> (value, waktu simpan, ukuran)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expired(self, stamp: float) -> bool:
+        return self.ttl is not None and time.time() - stamp > self.ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or self._expired(item[1]):
+                if item is not None:
+                    self._drop(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def peek(self, key, default=None):
+        """Seperti get, tanpa mengubah urutan LRU dan counter."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or self._expired(item[1]):
+                return default
+            return item[0]
+
+    def put(self, key, value, stamp: float = None):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (value, stamp or time.time(), size)
+            self._bytes += size
+            while self._data and (
+                (self.maxsize is not None and len(self._data) > self.maxsize)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def items(self):
+        """Snapshot (key, value) yang belum kedaluwarsa, urutan LRU (lama -> baru)."""
+        with self._lock:
+            return [(k, v) for k, (v, stamp, _) in self._data.items() if not self._expired(stamp)]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SqliteKV:
+    """
+    Key-value persisten di SQLite (satu tabel: key, value, created).
+
+    Args:
+        max_rows: jumlah baris maksimum (yang terlama dibuang; None = tanpa batas)
+        max_age: umur maksimum baris dalam detik (None = tidak kedaluwarsa)
+        prune_every: pangkas ulang setiap sekian put (juga sekali saat dibuka)
+    """
+
+    def __init__(self, path: str, table: str = "kv", max_rows: int = None, max_age: float = None,
+                 prune_every: int = 256):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.table = table
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.prune_every = prune_every
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: commit tanpa fsync (hanya saat checkpoint); cukup aman untuk cache
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value BLOB, created REAL)"
+        )
+        self._conn.commit()
+        self.prune()
+
+    def prune(self) -> int:
+        """Buang baris yang lebih tua dari max_age dan yang melebihi max_rows. Return jumlah dibuang."""
+        removed = 0
+        with self._lock:
+            if self.max_age is not None:
+                removed += self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE created < ?", (time.time() - self.max_age,)
+                ).rowcount
+            if self.max_rows is not None:
+                removed += self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key NOT IN "
+                    f"(SELECT key FROM {self.table} ORDER BY created DESC LIMIT ?)", (int(self.max_rows),)
+                ).rowcount
+            self._conn.commit()
+        return removed
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, value, created: float = None):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created) VALUES (?, ?, ?)",
+                (key, value, created or time.time()),
+            )
+            self._conn.commit()
+            self._puts += 1
+            due = self.prune_every and self._puts % self.prune_every == 0
+        if due and (self.max_rows is not None or self.max_age is not None):
+            self.prune()
+
+    def items(self, limit: int = None, max_age: float = None):
+        """(key, value, created) terbaru dulu."""
+        sql = f"SELECT key, value, created FROM {self.table}"
+        args = []
+        if max_age is not None:
+            sql += " WHERE created >= ?"
+            args.append(time.time() - max_age)
+        sql += " ORDER BY created DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
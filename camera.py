@@ -0,0 +1,110 @@
+# camera.py
+# Thread grabber kamera: terus menguras buffer cv2.VideoCapture ke ring buffer kecil
+# berisi frame yang sudah dialokasikan, supaya saat tombol ditekan yang diproses adalah
+# frame terbaru (bukan frame lama yang tertahan di buffer driver).
+
+import time
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+# ====== KONFIG ======
+NUM_SLOTS = 4  # >= 3: satu sedang ditulis, satu "latest", sisanya bisa dipinjam pipeline
+
+
+class FrameGrabber:
+    """
+    Ring buffer frame kamera yang diisi thread latar belakang.
+
+    Frame didekode langsung ke slot yang sudah dialokasikan (tanpa alokasi per frame).
+    `lease()` meminjamkan slot terbaru tanpa copy; selama dipinjam slot itu tidak ditimpa.
+    """
+
+    def __init__(self, cap, num_slots: int = NUM_SLOTS):
+        if num_slots < 3:
+            raise ValueError("num_slots minimal 3")
+        ok, first = cap.read()
+        if not ok:
+            raise RuntimeError("Tidak bisa membaca frame pertama dari kamera.")
+        self.cap = cap
+        self._slots = [first] + [np.empty_like(first) for _ in range(num_slots - 1)]
+        self._leases = [0] * num_slots
+        self._latest = 0
+        self._seq = 1
+        self._stamp = time.perf_counter()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.dropped = 0  # frame yang gagal dibaca
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="FrameGrabber", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self.cap.release()
+
+    def _free_slot(self):
+        """Slot yang boleh ditulis: bukan latest dan tidak sedang dipinjam."""
+        with self._cond:
+            while self._running:
+                for i in range(len(self._slots)):
+                    if i != self._latest and self._leases[i] == 0:
+                        return i
+                self._cond.wait(0.1)
+        return None
+
+    def _run(self):
+        while self._running:
+            slot = self._free_slot()
+            if slot is None:
+                break
+            buf = self._slots[slot]
+            ok, img = self.cap.read(buf)
+            if not ok:
+                self.dropped += 1
+                time.sleep(0.01)
+                continue
+            with self._cond:
+                if img is not buf:
+                    # OpenCV mengalokasikan ulang (ukuran/format berubah)
+                    self._slots[slot] = img
+                self._latest = slot
+                self._seq += 1
+                self._stamp = time.perf_counter()
+                self._cond.notify_all()
+
+    def wait_newer(self, seq: int, timeout: float = 1.0) -> bool:
+        """Tunggu sampai ada frame dengan nomor urut > seq."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._seq > seq or not self._running, timeout)
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    @contextmanager
+    def lease(self):
+        """
+        Pinjam frame terbaru tanpa copy.
+
+        Yields:
+            (frame ndarray, seq, umur frame dalam detik)
+        """
+        with self._cond:
+            slot = self._latest
+            self._leases[slot] += 1
+            frame, seq, age = self._slots[slot], self._seq, time.perf_counter() - self._stamp
+        try:
+            yield frame, seq, age
+        finally:
+            with self._cond:
+                self._leases[slot] -= 1
+                self._cond.notify_all()
@@ -0,0 +1,152 @@
+# controller.py
+# Controller latency budget: mengukur TTFA (time-to-first-audio) dan waktu tahap setiap
+# trigger (EWMA), lalu menurunkan atau menaikkan "level kualitas" di antara trigger agar
+# tetap di bawah target. Level mengatur imgsz + conf FastSAM, profile pre-processing, dan
+# num_predict Moondream. Setiap keputusan dicatat (print saat berubah + JSONL).
+
+import os
+import json
+import time
+
+# ====== KONFIG ======
+TARGET_TTFA   = 3.0     # detik sejak trigger sampai audio pertama
+EWMA_ALPHA    = 0.3     # bobot pengukuran terbaru
+HEADROOM      = 0.75    # naik level hanya jika EWMA < target * HEADROOM
+UP_AFTER      = 3       # ... selama sekian trigger berturut-turut
+DOWN_AFTER    = 1       # turun level setelah sekian trigger di atas target
+DECISION_LOG  = os.path.join("Output", "budget.jsonl")
+
+# Level 0 = kualitas penuh; makin tinggi makin cepat
+LEVELS = [
+    {"imgsz": 640, "conf": 0.40, "profile": "auto", "num_predict": 150},
+    {"imgsz": 640, "conf": 0.40, "profile": "fast", "num_predict": 120},
+    {"imgsz": 512, "conf": 0.45, "profile": "fast", "num_predict": 100},
+    {"imgsz": 416, "conf": 0.50, "profile": "fast", "num_predict": 80},
+    {"imgsz": 320, "conf": 0.50, "profile": "off",  "num_predict": 60},
+]
+
+
+class LatencyBudgetController:
+    """
+    Pilih level parameter per trigger berdasarkan EWMA TTFA.
+
+    Hysteresis: turun (lebih cepat) setelah `down_after` trigger dengan EWMA > target;
+    naik (lebih bagus) hanya setelah `up_after` trigger berturut-turut dengan
+    EWMA < target * headroom. Setiap kali level berubah, counter dan EWMA di-reset:
+    EWMA diisi ulang dari sampel level baru, jadi satu trigger lambat (mis. trigger dingin
+    pertama) tidak menurunkan beberapa level sekaligus. Sampel dari trigger yang berjalan
+    dengan level lama (mode pipelined, umpan balik terlambat satu trigger) diabaikan.
+
+    lock_imgsz=True mempertahankan imgsz level 0 (backend ONNX di-export dengan ukuran tetap).
+    """
+
+    def __init__(self, target: float = TARGET_TTFA, levels=None, alpha: float = EWMA_ALPHA,
+                 headroom: float = HEADROOM, up_after: int = UP_AFTER, down_after: int = DOWN_AFTER,
+                 lock_imgsz: bool = False, log_path: str = DECISION_LOG):
+        self.target = target
+        self.levels = [dict(l) for l in (levels or LEVELS)]
+        if lock_imgsz:
+            for l in self.levels:
+                l["imgsz"] = self.levels[0]["imgsz"]
+        self.alpha = alpha
+        self.headroom = headroom
+        self.up_after = up_after
+        self.down_after = down_after
+        self.log_path = log_path
+        self.level = 0
+        self.ewma = {}           # nama metrik -> EWMA (detik)
+        self._over = 0
+        self._under = 0
+        self.decisions = 0
+        self.failures = 0        # trigger gagal (tanpa TTFA) -- tidak memengaruhi level
+
+    def params(self) -> dict:
+        """Parameter level aktif (salinan, aman dibawa konteks trigger)."""
+        return dict(self.levels[self.level], level=self.level)
+
+    def _update_ewma(self, metrics: dict):
+        for name, value in metrics.items():
+            if value is None:
+                continue
+            prev = self.ewma.get(name)
+            self.ewma[name] = value if prev is None else self.alpha * value + (1 - self.alpha) * prev
+
+    def observe(self, ttfa: float, stages: dict = None, level: int = None) -> dict:
+        """
+        Masukkan hasil satu trigger lalu putuskan level berikutnya.
+
+        Args:
+            ttfa: detik sejak trigger sampai audio pertama (None jika gagal -> hanya dicatat,
+                  level, counter, dan EWMA tidak berubah)
+            stages: durasi tahap (detik), mis. {"segmentation": .., "vlm": ..}
+            level: level yang dipakai trigger itu (params()["level"]); None -> level aktif
+
+        Returns:
+            dict keputusan: action ("down"/"up"/"hold"), level lama/baru, EWMA, alasan.
+        """
+        prev = self.level
+        action, reason = "hold", "dalam budget"
+        stale = level is not None and level != self.level
+        failed = ttfa is None
+        if not stale and not failed:
+            self._update_ewma(dict(stages or {}, ttfa=ttfa))
+        est = self.ewma.get("ttfa")
+
+        if stale:
+            reason = f"sampel level {level} (bukan level aktif), diabaikan"
+        elif failed:
+            self.failures += 1
+            reason = f"trigger gagal (tanpa TTFA, total {self.failures}), level tidak diubah"
+        elif est is None:
+            reason = "belum ada TTFA"
+        elif est > self.target:
+            self._over += 1
+            self._under = 0
+            if self.level + 1 < len(self.levels) and self._over >= self.down_after:
+                self.level += 1
+                action, reason = "down", f"EWMA TTFA {est:.2f}s > target {self.target:.2f}s"
+            elif self.level + 1 >= len(self.levels):
+                reason = "di atas target, sudah level tercepat"
+            else:
+                reason = f"di atas target ({self._over}/{self.down_after} trigger)"
+        elif est < self.target * self.headroom:
+            self._under += 1
+            self._over = 0
+            if self.level > 0 and self._under >= self.up_after:
+                self.level -= 1
+                action = "up"
+                reason = (f"EWMA TTFA {est:.2f}s < {self.target * self.headroom:.2f}s "
+                          f"selama {self._under} trigger")
+        else:
+            self._over = self._under = 0
+
+        if action != "hold":
+            # Mulai ulang pengukuran di level baru
+            self._over = self._under = 0
+            self.ewma = {}
+        decision = {
+            "t": round(time.time(), 3),
+            "action": action,
+            "from_level": prev,
+            "to_level": self.level,
+            "ttfa": None if ttfa is None else round(ttfa, 3),
+            "ewma": {k: round(v, 3) for k, v in self.ewma.items()},
+            "params": self.params(),
+            "reason": reason,
+        }
+        self._log(decision)
+        return decision
+
+    def _log(self, decision: dict):
+        self.decisions += 1
+        if decision["action"] != "hold":
+            p = decision["params"]
+            print(f"[Budget] {decision['action'].upper()} level {decision['from_level']} -> "
+                  f"{decision['to_level']} ({decision['reason']}): imgsz {p['imgsz']}, conf {p['conf']}, "
+                  f"preprocess {p['profile']}, num_predict {p['num_predict']}")
+        else:
+            print(f"[Budget] hold level {self.level} ({decision['reason']})")
+        if self.log_path:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(decision, ensure_ascii=False) + "\n")
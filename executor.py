@@ -0,0 +1,178 @@
+# executor.py
+# Executor pipeline bertahap: satu worker thread per tahap, antrean terbatas di antara tahap.
+# Segmentasi trigger N+1 bisa berjalan bersamaan dengan inferensi Moondream trigger N.
+
+import time
+import threading
+import traceback
+from collections import deque
+
+# ====== KONFIG ======
+QUEUE_SIZE = 2
+POLICIES = ("drop_oldest", "coalesce", "queue")
+# drop_oldest : antrean penuh -> item paling lama dibuang
+# coalesce    : item baru menggantikan semua item yang masih menunggu (hanya yang terbaru diproses)
+# queue       : antrean penuh -> pengirim menunggu sampai ada tempat
+
+
+class StageQueue:
+    """Antrean terbatas dengan kebijakan back-pressure dan metrik waktu tunggu."""
+
+    def __init__(self, maxsize: int = QUEUE_SIZE, policy: str = "queue", on_drop=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Policy tidak dikenal: {policy}")
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.on_drop = on_drop  # dipanggil on_drop(item) untuk setiap item yang dibuang
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+        self.max_depth = 0
+
+    def put(self, item) -> int:
+        """Masukkan item; kembalikan jumlah item lama yang dibuang karena back-pressure."""
+        dropped = []
+        with self._cond:
+            if self.policy == "coalesce":
+                dropped = [old for old, _ in self._items]
+                self._items.clear()
+            elif self.policy == "drop_oldest":
+                while len(self._items) >= self.maxsize:
+                    dropped.append(self._items.popleft()[0])
+            else:
+                self._cond.wait_for(lambda: len(self._items) < self.maxsize or self._closed)
+            self._items.append((item, time.perf_counter()))
+            self.max_depth = max(self.max_depth, len(self._items))
+            self.dropped += len(dropped)
+            self._cond.notify_all()
+        if self.on_drop is not None:
+            for old in dropped:
+                self.on_drop(old)
+        return len(dropped)
+
+    def get(self):
+        """Ambil item berikutnya (blocking). Return (item, waktu tunggu detik) atau None jika ditutup."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self._closed)
+            if not self._items:
+                return None
+            item, t_enq = self._items.popleft()
+            self._cond.notify_all()
+        return item, time.perf_counter() - t_enq
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class _StageStats:
+    def __init__(self):
+        self.processed = 0
+        self.failed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.busy_total = 0.0
+
+    def as_dict(self, queue: StageQueue) -> dict:
+        n = max(1, self.processed + self.failed)
+        return {
+            "depth": len(queue),
+            "max_depth": queue.max_depth,
+            "dropped": queue.dropped,
+            "processed": self.processed,
+            "failed": self.failed,
+            "wait_avg_ms": round(self.wait_total / n * 1000, 1),
+            "wait_max_ms": round(self.wait_max * 1000, 1),
+            "busy_avg_ms": round(self.busy_total / n * 1000, 1),
+        }
+
+
+class StagedExecutor:
+    """
+    Pipeline bertahap: stages = [(nama, fn), ...].
+
+    Setiap fn menerima satu item (dict konteks) dan mengembalikan item untuk tahap
+    berikutnya, atau None untuk menghentikan item itu. Setiap tahap punya satu worker
+    dan satu antrean masuk berukuran `maxsize`. Kebijakan `policy` hanya berlaku di
+    antrean submit (tahap pertama); antrean antar tahap selalu "queue" (blocking), jadi
+    trigger yang sudah tersegmentasi tidak pernah dibuang diam-diam.
+
+    on_error(nama tahap, item, exc) dipanggil saat tahap gagal; on_drop(item) untuk item
+    yang dibuang back-pressure di antrean submit.
+    """
+
+    def __init__(self, stages, maxsize: int = QUEUE_SIZE, policy: str = "queue", on_error=None,
+                 thread_init=None, on_drop=None):
+        self.stages = list(stages)
+        self.thread_init = thread_init  # dipanggil thread_init(nama tahap) di awal setiap worker
+        self.queues = [StageQueue(maxsize, policy, on_drop) if i == 0 else StageQueue(maxsize, "queue")
+                       for i in range(len(self.stages))]
+        self.stats_ = [_StageStats() for _ in self.stages]
+        self.on_error = on_error
+        self._threads = []
+
+    def start(self):
+        for i, (name, _) in enumerate(self.stages):
+            t = threading.Thread(target=self._worker, args=(i,), name=f"stage-{name}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def submit(self, item) -> int:
+        """Masukkan item ke tahap pertama. Return jumlah item yang dibuang oleh back-pressure."""
+        return self.queues[0].put(item)
+
+    def stop(self, drain: bool = True, timeout: float = None):
+        """
+        Hentikan worker. drain=True: tahap ditutup berurutan sehingga item yang masih
+        di antrean diselesaikan dulu; drain=False: tutup semua antrean tanpa menunggu.
+        """
+        if not drain:
+            for q in self.queues:
+                q.close()
+            return
+        for q, t in zip(self.queues, self._threads):
+            q.close()
+            t.join(timeout=timeout)
+
+    def _worker(self, i: int):
+        name, fn = self.stages[i]
+        q, st = self.queues[i], self.stats_[i]
+        if self.thread_init is not None:
+            self.thread_init(name)
+        while True:
+            got = q.get()
+            if got is None:
+                break
+            item, waited = got
+            st.wait_total += waited
+            st.wait_max = max(st.wait_max, waited)
+            t0 = time.perf_counter()
+            try:
+                out = fn(item)
+                st.processed += 1
+            except Exception as e:
+                st.failed += 1
+                out = None
+                print(f"[Executor] Tahap {name} gagal: {e}")
+                traceback.print_exc()
+                if self.on_error is not None:
+                    self.on_error(name, item, e)
+            st.busy_total += time.perf_counter() - t0
+            if out is not None and i + 1 < len(self.stages):
+                self.queues[i + 1].put(out)
+
+    def stats(self) -> dict:
+        """Metrik per tahap: kedalaman antrean, item dibuang, rata-rata/maks waktu tunggu, waktu kerja."""
+        return {name: st.as_dict(q) for (name, _), q, st in zip(self.stages, self.queues, self.stats_)}
+
+    def print_stats(self):
+        for name, s in self.stats().items():
+            print(f"[Executor] {name:10s}: depth {s['depth']} (max {s['max_depth']}) | "
+                  f"dropped {s['dropped']} | wait avg {s['wait_avg_ms']:.0f} ms "
+                  f"(max {s['wait_max_ms']:.0f}) | busy avg {s['busy_avg_ms']:.0f} ms")
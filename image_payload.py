@@ -0,0 +1,118 @@
+# image_payload.py
+# Tahap payload gambar untuk Moondream: perkecil ke resolusi input vision encoder, encode
+# JPEG/WebP di memori dengan kualitas yang bisa diatur, dan (opsional) crop ke union bbox
+# objek terpilih. Payload jauh lebih kecil dari PNG 1280x720 lossless, jadi encode,
+# transfer ke Ollama, dan decode di sisi Ollama ikut lebih cepat.
+# Kalau gambar di-crop, posisi objek di prompt harus dihitung ulang relatif ke crop
+# (crop_objects), supaya left/center/right dan near/medium/far sesuai gambar yang dilihat Moondream.
+
+import time
+import base64
+import cv2
+import numpy as np
+
+from segmentation import analyze_position
+
+# ====== KONFIG ======
+VLM_INPUT_SIZE  = 378      # sisi input vision encoder Moondream (SigLIP 378x378)
+PAYLOAD_FORMAT  = "jpeg"   # "jpeg" | "webp" | "png"
+PAYLOAD_QUALITY = 85       # kualitas JPEG/WebP (1-100)
+ROI_CROP        = False    # True -> crop ke union bbox objek sebelum resize
+ROI_PAD         = 0.10     # padding crop (fraksi ukuran union bbox)
+ROI_MIN_FRAC    = 0.25     # crop minimal sekian fraksi sisi frame (konteks tetap ada)
+
+_EXT = {"jpeg": ".jpg", "webp": ".webp", "png": ".png"}
+
+
+def union_bbox(objects: list, W: int, H: int, pad: float = ROI_PAD, min_frac: float = ROI_MIN_FRAC):
+    """Union bbox semua objek + padding, dijepit ke frame. None jika tidak ada objek."""
+    if not objects:
+        return None
+    b = np.array([o["bbox"] for o in objects], dtype=np.float64)
+    x1, y1 = b[:, 0].min(), b[:, 1].min()
+    x2, y2 = b[:, 2].max(), b[:, 3].max()
+    w = max(x2 - x1, W * min_frac)
+    h = max(y2 - y1, H * min_frac)
+    cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+    w, h = w * (1 + 2 * pad), h * (1 + 2 * pad)
+    x1, x2 = int(max(0, cx - w / 2)), int(min(W, cx + w / 2))
+    y1, y2 = int(max(0, cy - h / 2)), int(min(H, cy + h / 2))
+    if x2 - x1 < 2 or y2 - y1 < 2:
+        return None
+    return x1, y1, x2, y2
+
+
+def crop_objects(objects: list, box) -> list:
+    """Salinan objek dengan bbox + h/v_position relatif ke crop box (x1, y1, x2, y2)."""
+    cx1, cy1, cx2, cy2 = box
+    cw, ch = cx2 - cx1, cy2 - cy1
+    out = []
+    for obj in objects:
+        x1, y1, x2, y2 = obj["bbox"]
+        bbox = [max(0, x1 - cx1), max(0, y1 - cy1), min(cw, x2 - cx1), min(ch, y2 - cy1)]
+        h_pos, v_pos = analyze_position(*bbox, cw, ch)
+        out.append(dict(obj, bbox=bbox, h_position=h_pos, v_position=v_pos))
+    return out
+
+
+def resize_for_vlm(img, size: int = VLM_INPUT_SIZE) -> np.ndarray:
+    """Perkecil agar sisi terpanjang = size (aspect ratio tetap, tidak pernah memperbesar)."""
+    h, w = img.shape[:2]
+    scale = size / max(h, w)
+    if scale >= 1.0:
+        return img
+    return cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+def _encode_params(fmt: str, quality: int) -> list:
+    if fmt == "jpeg":
+        return [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+    if fmt == "webp":
+        return [cv2.IMWRITE_WEBP_QUALITY, int(quality)]
+    return [cv2.IMWRITE_PNG_COMPRESSION, 1]
+
+
+def encode_payload(img, objects: list = None, fmt: str = None, quality: int = None,
+                   size: int = None, roi: bool = None):
+    """
+    Siapkan gambar untuk Moondream.
+
+    Args:
+        img: ndarray BGR (gambar tersegmentasi, koordinat sama dengan bbox objek)
+        objects: daftar objek segment_objects (untuk ROI crop)
+        fmt, quality, size, roi: default PAYLOAD_FORMAT, PAYLOAD_QUALITY, VLM_INPUT_SIZE, ROI_CROP
+
+    Returns:
+        (base64 str, info dict: format, shape, roi, bytes, b64_bytes, encode_ms)
+        info["roi"] = crop box (x1, y1, x2, y2) di koordinat img, atau None tanpa crop;
+        pakai crop_objects(objects, info["roi"]) untuk posisi objek di prompt.
+    """
+    fmt = (fmt or PAYLOAD_FORMAT).lower()
+    if fmt not in _EXT:
+        raise ValueError(f"Format payload tidak dikenal: {fmt} (pilihan: {tuple(_EXT)})")
+    quality = PAYLOAD_QUALITY if quality is None else quality
+    size = size or VLM_INPUT_SIZE
+    roi = ROI_CROP if roi is None else roi
+
+    t0 = time.perf_counter()
+    box = None
+    if roi and objects:
+        H, W = img.shape[:2]
+        box = union_bbox(objects, W, H)
+        if box is not None:
+            x1, y1, x2, y2 = box
+            img = img[y1:y2, x1:x2]
+    small = resize_for_vlm(img, size)
+    ok, buf = cv2.imencode(_EXT[fmt], small, _encode_params(fmt, quality))
+    if not ok:
+        raise ValueError(f"Gagal meng-encode gambar ({fmt})")
+    b64 = base64.b64encode(buf).decode("utf-8")
+    info = {
+        "format": fmt,
+        "shape": [int(small.shape[1]), int(small.shape[0])],
+        "roi": list(box) if box is not None else None,
+        "bytes": int(buf.size),
+        "b64_bytes": len(b64),
+        "encode_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+    return b64, info
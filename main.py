@@ -1,20 +1,32 @@
 import os
 import cv2
 import time
+import argparse
 from datetime import datetime
-import Jetson.GPIO as GPIO
 
-from segmentation import segment_objects
+from segmentation import segment_objects, SEG_BACKEND
 from test import (
-    encode_image_base64, 
     build_prompt, 
     build_segments_info,
     query_ollama_vision, 
+    stream_ollama_vision,
     clean_output_for_tts, 
     MODEL_NAME
 )
-from translator_argos import translate_id
-from tts_piper import speak_id
+from translator_argos import translate_id, translation_cache_stats, argos_stats
+from tts_piper import speak_id, tts_cache_stats
+from streaming import stream_describe_and_speak
+from model_pool import get_pool
+from camera import FrameGrabber
+from vlm_client import get_client
+from vlm_cache import get_vlm_cache
+from executor import StagedExecutor
+from triggers import TriggerHub, TriggerEvent, make_trigger, INPUT_BACKENDS
+from tracker import ObjectTracker
+from controller import LatencyBudgetController
+from image_payload import encode_payload, crop_objects
+from resources import apply_thread_budget, pin_current_thread
+from tracing import get_tracer, span, TRACE_PATH, METRICS_PATH
 
 # === KONFIGURASI ===
 OUTPUT_DIR = "Output"
@@ -25,14 +37,29 @@ os.makedirs(FRAMES_DIR, exist_ok=True)
 CAMERA_INDEX = 0
 FRAME_WIDTH, FRAME_HEIGHT, FPS = 1280, 720, 30
 
+SAVE_DEBUG = False  # True -> simpan frame kamera + PNG/JSON segmentasi ke disk
+STREAM_MODE = True  # True -> kalimat pertama dibacakan selagi Moondream masih generate
+SAVE_WAV = False  # True -> simpan audio TTS ke Output/<frame>.wav (debug)
+VLM_CACHE = True  # True -> adegan yang sama (pHash + objek) tidak dikirim ulang ke Moondream
+
+QUEUE_SIZE = 2              # kapasitas antrean antar tahap
+BACKPRESSURE = "coalesce"   # "drop_oldest" | "coalesce" | "queue"
+
+INPUT_BACKEND = "gpio"      # "gpio" | "keyboard" | "socket" | "replay"
 BUTTON_PIN = 37
 DEBOUNCE_SEC = 0.15
 
+MODE = "trigger"            # "trigger" (tombol) | "continuous" (segmentasi terus-menerus + tracker)
+CONTINUOUS_FPS = 2.0        # laju segmentasi mode continuous
+
+ADAPTIVE_BUDGET = True      # True -> imgsz/conf/preprocess/num_predict disesuaikan agar TTFA <= TTFA_BUDGET
+TTFA_BUDGET = 3.0           # detik sejak trigger sampai audio pertama
+
 # === STATE GLOBAL ===
-last_press_time = 0.0
-trigger_requested = False
-is_processing = False
-cap = None
+trigger_counter = 0
+grabber = None
+executor = None
+controller = None
 
 
 def open_camera():
@@ -45,159 +72,433 @@ def open_camera():
     return cap
 
 
-def save_frame(frame):
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    path = os.path.join(FRAMES_DIR, f"frame_{ts}.jpg")
+def frame_name():
+    return "frame_" + datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+
+
+def save_frame(frame, name=None):
+    path = os.path.join(FRAMES_DIR, f"{name or frame_name()}.jpg")
     cv2.imwrite(path, frame)
     return path
 
 
-def save_outputs(base_name, en_text, id_text, latency):
-    """Simpan file output teks dan latency"""
+def save_outputs(base_name, en_text, id_text):
+    """Simpan file output teks (latency ada di trace.jsonl / metrics.prom)"""
     with open(os.path.join(OUTPUT_DIR, f"{base_name}_en.txt"), "w", encoding="utf-8") as f:
         f.write(en_text)
     with open(os.path.join(OUTPUT_DIR, f"{base_name}_id.txt"), "w", encoding="utf-8") as f:
         f.write(id_text)
+
+
+def new_context(event=None) -> dict:
+    """Konteks satu trigger yang dibawa dari tahap ke tahap (titik nol = saat trigger terjadi)."""
+    global trigger_counter
+    trigger_counter += 1
+    perf_start = event.t if event is not None else time.perf_counter()
+    source = event.source if event is not None else "manual"
+    # Span root dimulai saat trigger (bukan saat tahap pertama jalan)
+    root = get_tracer().start_span("pipeline", start_ns=int(perf_start * 1e9),
+                                   trigger=trigger_counter, source=source)
+    return {
+        "id": trigger_counter,
+        "source": source,
+        "perf_start": perf_start,
+        "trace": root,
+        "ttfa": None,
+        # Parameter dibekukan per trigger; controller hanya mengubahnya di antara trigger
+        "params": controller.params() if controller is not None else {},
+    }
+
+
+def stage_segment(ctx):
+    """Tahap 1: ambil frame terbaru -> segmentasi -> encode gambar + prompt"""
+    root = ctx["trace"]
+    wait = get_tracer().record("trigger_to_start", time.perf_counter() - ctx["perf_start"], parent=root)
+    print(f"\n========== PIPELINE #{ctx['id']} DIMULAI ({ctx['source']}, "
+          f"trigger->mulai {wait.duration_s * 1000:.1f} ms) ==========")
+    
+    with span("stage.segment", parent=root):
+        if ctx.get("seg") is not None:
+            # Mode continuous: segmentasi sudah dijalankan loop tracker untuk frame ini
+            base = frame_name()
+            print(f"[1/7] Frame #{ctx['frame_seq']} dari tracker: {base}")
+            seg, frame = ctx.pop("seg"), ctx.pop("frame")
+            print(f"[2/7] Segmentasi (tracker): {len(seg.get('objects', []))} objek")
+            inputs = prepare_vlm_inputs(frame, seg)
+        else:
+            # Frame terbaru dari grabber; slot dipinjam (tanpa copy) sampai gambar ter-encode
+            with grabber.lease() as (frame, seq, age):
+                base = frame_name()
+                if SAVE_DEBUG:
+                    print(f"[1/7] Frame disimpan: {save_frame(frame, base)}")
+                else:
+                    print(f"[1/7] Frame #{seq} diambil: {base} (umur {age * 1000:.0f} ms)")
+            
+                # Segmentasi (frame langsung dari memori)
+                with span("segmentation") as sp:
+                    seg = segment_objects(frame, save_debug=SAVE_DEBUG, **seg_params(ctx["params"]))
+                print(f"[2/7] Segmentasi selesai: {len(seg.get('objects', []))} objek ({sp.duration_s:.3f}s)")
+                inputs = prepare_vlm_inputs(frame, seg)
+        
+        with span("build_prompt"):
+            prompt = build_prompt(inputs["segments_info"])
+        payload = inputs["payload"]
+        if payload is None:
+            print("[3/7] Prompt selesai (encode dilewati, cache hit)")
+        else:
+            w, h = payload["shape"]
+            print(f"[3/7] Encoding & prompt selesai ({inputs['encode_s']:.3f}s, "
+                  f"{payload['format']} {w}x{h}, {payload['bytes'] / 1024:.1f} KB"
+                  f"{', ROI ' + str(payload['roi']) if payload['roi'] else ''})")
     
-    with open(os.path.join(OUTPUT_DIR, f"{base_name}_latency.txt"), "w", encoding="utf-8") as f:
-        f.write("=== LATENCY REPORT ===\n\n")
-        for step, duration in latency.items():
-            if step != "total_pipeline":
-                percentage = (duration / latency["total_pipeline"]) * 100
-                f.write(f"{step:25s}: {duration:6.3f}s ({percentage:5.1f}%)\n")
-        f.write(f"\n{'TOTAL PIPELINE':25s}: {latency['total_pipeline']:6.3f}s (100.0%)\n")
+    objects, img_b64 = inputs["objects"], inputs["img_b64"]
+    cached, cache_key = inputs["cached"], inputs["cache_key"]
+    ctx.update(base=base, objects=objects, prompt=prompt, img_b64=img_b64,
+               cached=cached, cache_key=cache_key)
+    ctx["wav_path"] = os.path.join(OUTPUT_DIR, f"{base}.wav") if SAVE_WAV else None
+    return ctx
 
 
-def run_pipeline():
-    """Pipeline lengkap: capture -> segment -> VLM -> translate -> TTS"""
-    global cap
+def seg_params(params: dict) -> dict:
+    """Argumen segment_objects dari parameter controller (kosong -> default modul)."""
+    return {"imgsz": params.get("imgsz"), "conf": params.get("conf"), "profile": params.get("profile")}
+
+
+def prepare_vlm_inputs(frame, seg) -> dict:
+    """Segments info, lookup cache VLM, dan encode gambar tersegmentasi (dalam span stage aktif)."""
+    seg_img = seg.get("segmented_image")
+    if seg_img is None:
+        seg_img = frame
+    objects = seg.get("objects", [])
     
-    print("\n================= PIPELINE DIMULAI =================")
-    wall_start = time.time()
-    latency = {}
+    with span("build_segments"):
+        segments_info = build_segments_info(objects) if objects else ""
     
-    # Capture frame
-    ok, frame = cap.read()
-    if not ok:
-        print("[ERR] Gagal membaca frame kamera.")
-        return
+    # Cache jawaban VLM berdasarkan isi adegan
+    cached, cache_key = None, None
+    if VLM_CACHE:
+        with span("vlm_cache_lookup") as sp:
+            cached, cache_key = get_vlm_cache().lookup(seg_img, objects)
+            sp.set(hit=cached is not None)
     
-    img_path = save_frame(frame)
-    print(f"[1/7] Frame disimpan: {img_path}")
+    # Payload gambar: resize ke input Moondream + JPEG/WebP (+ ROI crop); tidak perlu kalau cache hit
+    img_b64, payload = None, None
+    with span("encode_image") as sp:
+        if cached is None:
+            img_b64, payload = encode_payload(seg_img, objects)
+            sp.set(bytes=payload["bytes"], format=payload["format"], shape=payload["shape"])
+    if payload is not None and payload["roi"] is not None:
+        # Gambar di-crop: posisi objek di prompt dihitung ulang relatif ke crop
+        with span("build_segments"):
+            segments_info = build_segments_info(crop_objects(objects, payload["roi"]))
+    return {"objects": objects, "segments_info": segments_info, "cached": cached,
+            "cache_key": cache_key, "img_b64": img_b64, "payload": payload, "encode_s": sp.duration_s}
+
+
+def stage_vlm(ctx):
+    """Tahap 2: Moondream -> cleaning"""
+    with span("stage.vlm", parent=ctx["trace"]):
+        with span("moondream_inference") as sp:
+            if ctx["cached"] is not None:
+                en_raw = ctx["cached"]
+                sp.set(cache_hit=True)
+            else:
+                en_raw = query_ollama_vision(MODEL_NAME, ctx["prompt"], ctx["img_b64"],
+                                             num_predict=ctx["params"].get("num_predict"))
+        if ctx["cached"] is not None:
+            print(f"[4/7] Moondream (cache hit): {en_raw[:50]}...")
+        else:
+            print(f"[4/7] Moondream: {en_raw[:50]}... ({sp.duration_s:.3f}s)")
+            if ctx["cache_key"] is not None:
+                get_vlm_cache().store(ctx["cache_key"], en_raw)
+        
+        with span("clean_output"):
+            ctx["en_tts"] = clean_output_for_tts(en_raw)
+    return ctx
+
+
+def stage_translate(ctx):
+    """Tahap 3: terjemahan EN -> ID"""
+    with span("stage.translate", parent=ctx["trace"]), span("translation") as sp:
+        ctx["id_tts"] = translate_id(ctx["en_tts"])
+    print(f"[5/7] Terjemahan: {ctx['id_tts'][:50]}... ({sp.duration_s:.3f}s)")
+    return ctx
+
+
+def stage_speak(ctx):
+    """Tahap 4: TTS + simpan output"""
+    with span("stage.tts", parent=ctx["trace"]), span("tts") as sp:
+        pcm, sr = speak_id(ctx["id_tts"], ctx["wav_path"])
+        sp.set(audio_s=round(pcm.size / max(1, sr), 3))
+    print(f"[6/7] TTS selesai: {pcm.size / max(1, sr):.2f}s audio ({sp.duration_s:.3f}s)")
+    finish(ctx)
+    return ctx
+
+
+def stage_stream(ctx):
+    """Tahap 2 (STREAM_MODE): Moondream -> cleaning -> translate -> TTS per kalimat"""
+    root = ctx["trace"]
+    recorded = []
+    if ctx["cached"] is not None:
+        tokens = [ctx["cached"]]
+        print("[4/7] Moondream (cache hit)")
+    else:
+        tokens = record_tokens(stream_ollama_vision(MODEL_NAME, ctx["prompt"], ctx["img_b64"],
+                                                    num_predict=ctx["params"].get("num_predict")), recorded)
+    with span("stage.stream", parent=root) as sp:
+        out = stream_describe_and_speak(ctx["prompt"], ctx["img_b64"], MODEL_NAME, tokens=tokens,
+                                        t_start=ctx["perf_start"], output_wav_path=ctx["wav_path"])
+        sp.set(cache_hit=ctx["cached"] is not None, error=out["error"])
+    if recorded and out["error"] is None and ctx["cache_key"] is not None:
+        get_vlm_cache().store(ctx["cache_key"], "".join(recorded).strip())
+    ctx["en_tts"], ctx["id_tts"] = out["en_text"], out["id_text"]
     
-    # Segmentasi
-    t0 = time.time()
-    seg = segment_objects(img_path)
-    latency["segmentation"] = time.time() - t0
+    # Titik waktu streaming (detik sejak trigger) dicatat sebagai span anak root
+    timing = out["timing"]
+    tracer = get_tracer()
+    for mark in ("first_token", "first_sentence", "vlm_done"):
+        if mark in timing:
+            tracer.record(mark, timing[mark], parent=root)
+    ttfa = ctx["ttfa"] = timing.get("first_audio")
+    if ttfa is not None:
+        tracer.record("ttfa", ttfa, parent=root)
+    print(f"[4/7] Moondream (stream): token pertama {timing.get('first_token', 0):.3f}s, "
+          f"selesai {timing.get('vlm_done', 0):.3f}s")
+    print(f"[5/7] Terjemahan: {ctx['id_tts'][:50]}...")
+    print(f"[6/7] TTS selesai: TIME TO FIRST AUDIO "
+          f"{ttfa if ttfa is not None else float('nan'):.3f}s "
+          f"({sp.duration_s:.3f}s)")
+    finish(ctx)
+    return ctx
+
+
+def record_tokens(tokens, sink: list):
+    """Teruskan token stream sambil menyimpannya (untuk cache VLM)."""
+    for tok in tokens:
+        sink.append(tok)
+        yield tok
+
+
+def finish(ctx):
+    """Tutup span root, cetak rincian trace, ekspor JSONL + snapshot Prometheus, simpan output"""
+    root = ctx["trace"].end()
+    tracer = get_tracer()
+    save_outputs(ctx["base"], ctx["en_tts"], ctx["id_tts"])
+    print_trace(tracer.trace_spans(root.trace_id), root)
+    tracer.flush_jsonl(TRACE_PATH)
+    tracer.write_prometheus(METRICS_PATH)
+    if controller is not None:
+        observe_budget(ctx, tracer.trace_spans(root.trace_id), root)
     
-    seg_img = seg.get("segmented_image_path") or img_path
-    objects = seg.get("objects", [])
-    print(f"[2/7] Segmentasi selesai: {len(objects)} objek ({latency['segmentation']:.3f}s)")
-    
-    # Build segments info
-    t0 = time.time()
-    segments_info = build_segments_info(objects) if objects else ""
-    latency["build_segments"] = time.time() - t0
-    
-    # Encode & build prompt
-    t0 = time.time()
-    img_b64 = encode_image_base64(seg_img)
-    latency["encode_image"] = time.time() - t0
-    
-    t0 = time.time()
-    prompt = build_prompt(segments_info)
-    latency["build_prompt"] = time.time() - t0
-    print(f"[3/7] Encoding & prompt selesai ({latency['encode_image']:.3f}s)")
-    
-    # Moondream inference
-    t0 = time.time()
-    en_raw = query_ollama_vision(MODEL_NAME, prompt, img_b64)
-    latency["moondream_inference"] = time.time() - t0
-    print(f"[4/7] Moondream: {en_raw[:50]}... ({latency['moondream_inference']:.3f}s)")
-    
-    # Clean output
-    t0 = time.time()
-    en_tts = clean_output_for_tts(en_raw)
-    latency["clean_output"] = time.time() - t0
-    
-    # Translate
-    t0 = time.time()
-    id_tts = translate_id(en_tts)
-    latency["translation"] = time.time() - t0
-    print(f"[5/7] Terjemahan: {id_tts[:50]}... ({latency['translation']:.3f}s)")
-    
-    # TTS
-    t0 = time.time()
-    wav_path = speak_id(id_tts)
-    latency["tts"] = time.time() - t0
-    print(f"[6/7] TTS selesai: {wav_path} ({latency['tts']:.3f}s)")
-    
-    # Total & save
-    latency["total_pipeline"] = sum(latency.values())
-    wall_time = time.time() - wall_start
-    
-    base = os.path.splitext(os.path.basename(img_path))[0]
-    save_outputs(base, en_tts, id_tts, latency)
-    
-    print(f"[7/7] Pipeline selesai: {latency['total_pipeline']:.3f}s (wall: {wall_time:.3f}s)")
-    print("================= PIPELINE SELESAI =================\n")
-
-
-def on_button_pressed():
-    global trigger_requested, is_processing
-    if is_processing:
-        print("[INFO] Pipeline masih berjalan. Abaikan.")
-        return
-    if not trigger_requested:
-        trigger_requested = True
-        print("[EVENT] Tombol ditekan! Pipeline akan dijalankan...")
+    print(f"[7/7] Pipeline #{ctx['id']} selesai: {root.duration_s:.3f}s (sejak trigger)")
+    print(f"========== PIPELINE #{ctx['id']} SELESAI ==========\n")
+    tracer.print_summary(("pipeline", "ttfa", "stage.segment", "stage.stream", "stage.vlm"))
+    if executor is not None:
+        executor.print_stats()
+    if VLM_CACHE:
+        st = get_vlm_cache().stats()
+        print(f"[VLMCache] hit {st['hits']} / miss {st['misses']} (hit rate {st['hit_rate']:.0%})")
+    st = translation_cache_stats()
+    print(f"[TranslateCache] hit {st['hits']} (disk {st['disk_hits']}) / miss {st['misses']} "
+          f"(hit rate {st['hit_rate']:.0%})")
+    st = argos_stats()
+    if st:
+        print(f"[ArgosTranslate] load {st['load_s']:.3f}s | translate avg {st['translate_avg_ms']:.0f} ms "
+              f"({st['calls']} panggilan)")
+    st = tts_cache_stats()
+    if st:
+        print(f"[TTSCache] hit {st['hits']} (disk {st['disk_hits']}) / miss {st['misses']} | "
+              f"{st['bytes'] / 1e6:.1f} MB")
 
 
-def button_callback(channel):
-    global last_press_time
-    now = time.time()
-    if now - last_press_time < DEBOUNCE_SEC:
-        return
-    last_press_time = now
-    on_button_pressed()
+def abort_context(ctx, **attrs):
+    """Trigger gagal / dibuang: tutup span root dengan atribut alasan dan tetap ekspor trace."""
+    if ctx["trace"].end_ns is not None:
+        return  # finish() sudah menutup trigger ini
+    root = ctx["trace"].set(**attrs).end()
+    tracer = get_tracer()
+    tracer.flush_jsonl(TRACE_PATH)
+    tracer.write_prometheus(METRICS_PATH)
+    if controller is not None and "error" in attrs:
+        observe_budget(ctx, tracer.trace_spans(root.trace_id), root, failed=True)
+    reason = f"gagal ({attrs['error']})" if "error" in attrs else "dibuang (back-pressure)"
+    print(f"[7/7] Pipeline #{ctx['id']} {reason}: {root.duration_s:.3f}s (sejak trigger)")
 
 
-def main():
-    global trigger_requested, is_processing, cap
+def on_stage_error(name, ctx, exc):
+    abort_context(ctx, error=f"{name}: {type(exc).__name__}: {exc}")
+
+
+def on_trigger_dropped(ctx):
+    abort_context(ctx, dropped=True)
+
+
+def observe_budget(ctx, spans, root, failed: bool = False):
+    """Laporkan TTFA + waktu tahap trigger ini ke controller (keputusan berlaku untuk trigger berikutnya)."""
+    names = {"segmentation": "segmentation", "moondream_inference": "vlm", "first_token": "first_token",
+             "translation": "translation", "tts": "tts"}
+    stages = {names[sp.name]: sp.duration_s for sp in spans if sp.name in names}
+    # Mode serial: audio baru diputar setelah seluruh pipeline selesai
+    ttfa = ctx["ttfa"] if STREAM_MODE else root.duration_s
+    if failed:
+        ttfa = None  # trigger gagal: hanya waktu tahap yang sempat jalan dicatat
+    controller.observe(ttfa, stages, level=ctx["params"].get("level"))
+
+
+def print_trace(spans, root):
+    """Rincian satu trigger: span bertingkat, durasi dan persentase terhadap total sejak trigger."""
+    children = {}
+    for sp in spans:
+        children.setdefault(sp.parent_id, []).append(sp)
+    total = max(1, root.duration_ns)
+
+    def walk(parent_id, depth):
+        for sp in sorted(children.get(parent_id, []), key=lambda s: s.start_ns):
+            print(f"[Trace] {'  ' * depth}{sp.name:{max(1, 28 - 2 * depth)}s}: "
+                  f"{sp.duration_s:7.3f}s ({sp.duration_ns / total * 100:5.1f}%)")
+            walk(sp.span_id, depth + 1)
+
+    walk(root.span_id, 0)
+
+
+def pipeline_stages():
+    """Daftar tahap executor sesuai mode (streaming atau biasa)."""
+    if STREAM_MODE:
+        return [("segment", stage_segment), ("stream", stage_stream)]
+    return [("segment", stage_segment), ("vlm", stage_vlm),
+            ("translate", stage_translate), ("tts", stage_speak)]
+
+
+def run_pipeline():
+    """Pipeline lengkap (serial, tanpa executor): capture -> segment -> VLM -> translate -> TTS"""
+    ctx = new_context()
+    for _, fn in pipeline_stages():
+        ctx = fn(ctx)
+
+
+def run_continuous(fps: float = CONTINUOUS_FPS):
+    """
+    Mode continuous: segmentasi frame terbaru pada laju `fps`, lacak objek antar frame,
+    dan kirim pipeline VLM + TTS hanya saat objek baru masuk band near atau pindah band.
+    """
+    pin_current_thread("tracker")
+    tracker = ObjectTracker()
+    period = 1.0 / max(0.1, fps)
+    seq_seen, n_events = 0, 0
+    print(f"=== Vision Assist — Continuous Mode ({fps:.1f} fps) ===")
+    print("Tekan Ctrl+C untuk keluar.\n")
+    try:
+        while True:
+            t0 = time.perf_counter()
+            if not grabber.wait_newer(seq_seen, timeout=1.0):
+                continue
+            with grabber.lease() as (frame, seq, age):
+                seq_seen = seq
+                params = controller.params() if controller is not None else {}
+                with span("tracker.segment"):
+                    seg = segment_objects(frame, save_debug=False, **seg_params(params))
+                H, W = frame.shape[:2]
+                events = tracker.update(seg.get("objects", []), W, H)
+                if events:
+                    n_events += 1
+                    for ev in events:
+                        print(f"[Tracker] {ev.describe()}")
+                    ctx = new_context(TriggerEvent("tracker", t0, n_events))
+                    # Frame dicopy: slot grabber dilepas setelah blok ini
+                    ctx.update(seg=seg, frame=frame.copy(), frame_seq=seq)
+                    dropped = executor.submit(ctx)
+                    if dropped:
+                        print(f"[INFO] {dropped} kejadian lama dibuang ({BACKPRESSURE}).")
+            time.sleep(max(0.0, period - (time.perf_counter() - t0)))
+    except KeyboardInterrupt:
+        print("\n[MAIN] Dihentikan. Keluar...")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Vision Assist — pipeline utama")
+    parser.add_argument("--mode", choices=("trigger", "continuous"), default=MODE,
+                        help="trigger: jalan saat tombol; continuous: tracker, VLM hanya saat ada kejadian")
+    parser.add_argument("--fps", type=float, default=CONTINUOUS_FPS, help="Laju segmentasi mode continuous")
+    parser.add_argument("--input", choices=INPUT_BACKENDS, default=INPUT_BACKEND,
+                        help="Sumber trigger (default: %(default)s)")
+    parser.add_argument("--pin", type=int, default=BUTTON_PIN, help="Pin fisik tombol (gpio)")
+    parser.add_argument("--socket", default=None, help="Path UNIX socket (socket)")
+    parser.add_argument("--replay", default=None,
+                        help="File jadwal replay: satu jeda (detik) per baris (replay)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    global grabber, executor, controller
+    args = parse_args(argv)
+    if ADAPTIVE_BUDGET:
+        # Backend ONNX di-export dengan imgsz tetap -> hanya torch yang boleh ganti imgsz
+        controller = LatencyBudgetController(TTFA_BUDGET, lock_imgsz=SEG_BACKEND != "torch")
     
-    # Setup GPIO
-    GPIO.setmode(GPIO.BOARD)
-    GPIO.setup(BUTTON_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-    GPIO.add_event_detect(BUTTON_PIN, GPIO.FALLING, callback=button_callback, bouncetime=1)
+    # Budget thread per engine (torch/OpenCV/Piper/Argos) sebelum model dimuat
+    apply_thread_budget()
+    
+    # Muat semua model sekali (resident) sebelum tombol pertama ditekan
+    pool = get_pool()
+    pool.preload()
+    pool.print_report()
+    
+    # Moondream: pin resident di Ollama (keep_alive) + warm-up, lalu cek kesiapan
+    vlm = get_client()
+    try:
+        vlm.warmup(MODEL_NAME)
+    except Exception as e:
+        print(f"[Ollama] Warning: warm-up gagal: {e}")
+    health = vlm.health(MODEL_NAME)
+    print(f"[Ollama] server={health['server']} versi={health['version']} "
+          f"model_loaded={health['model_loaded']}")
     
     # Buka kamera
-    cap = open_camera()
-    print("=== Vision Assist — Button Trigger Mode ===")
-    print(f"Tombol pada pin fisik {BUTTON_PIN}. Tekan untuk proses.")
+    grabber = FrameGrabber(open_camera()).start()
+    
+    # Executor bertahap: trigger baru diantrekan, tidak diabaikan
+    executor = StagedExecutor(pipeline_stages(), QUEUE_SIZE, BACKPRESSURE, on_error=on_stage_error,
+                              thread_init=pin_current_thread, on_drop=on_trigger_dropped).start()
+    
+    if args.mode == "continuous":
+        try:
+            run_continuous(args.fps)
+        finally:
+            executor.stop(drain=False)
+            grabber.stop()
+        return
+    
+    # Sumber trigger: callback langsung membangunkan loop utama (tanpa polling)
+    hub = TriggerHub(DEBOUNCE_SEC)
+    kwargs = {"pin": args.pin, "replay": args.replay}
+    if args.socket:
+        kwargs["socket_path"] = args.socket
+    source = make_trigger(args.input, **kwargs).start(hub)
+    print(f"=== Vision Assist — Trigger Mode ({args.input}) ===")
+    print(source.describe())
     print("Tekan Ctrl+C untuk keluar.\n")
     
+    interrupted = False
     try:
         while True:
-            if trigger_requested and not is_processing:
-                trigger_requested = False
-                is_processing = True
-                try:
-                    run_pipeline()
-                except Exception as e:
-                    print(f"[ERR] Pipeline gagal: {e}")
-                    import traceback
-                    traceback.print_exc()
-                finally:
-                    is_processing = False
-            
-            time.sleep(0.1)
+            event = hub.wait()
+            if event is None:
+                break
+            print(f"[EVENT] Trigger #{event.seq} ({event.source})! Pipeline akan dijalankan...")
+            dropped = executor.submit(new_context(event))
+            if dropped:
+                print(f"[INFO] {dropped} trigger lama dibuang ({BACKPRESSURE}).")
     
     except KeyboardInterrupt:
         print("\n[MAIN] Dihentikan. Keluar...")
+        interrupted = True
     finally:
-        if cap:
-            cap.release()
-        GPIO.cleanup()
+        source.stop()
+        if executor:
+            # Selesaikan trigger yang masih antre, kecuali dihentikan dengan Ctrl+C
+            executor.stop(drain=not interrupted)
+        if grabber:
+            grabber.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,212 @@
+# model_pool.py
+# Pool model process-wide: FastSAM, Piper TTS, dan Argos dimuat sekali lalu tetap resident.
+# Setiap model di-warm-up setelah load, memorinya dicatat, dan model yang paling lama
+# tidak dipakai (LRU) di-unload kalau total memori melewati batas.
+
+import os
+import gc
+import time
+import threading
+from collections import OrderedDict
+
+# ====== KONFIG ======
+MEMORY_LIMIT_MB = float(os.environ.get("MODEL_POOL_LIMIT_MB", "0"))  # 0 = tanpa batas
+WARMUP_ON_LOAD  = True
+
+
+def _rss_bytes() -> int:
+    """Resident set size proses saat ini (Linux/Jetson). 0 jika tidak tersedia."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def _cuda_bytes() -> int:
+    """Memori CUDA yang dialokasikan torch (0 jika torch/CUDA tidak dipakai)."""
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return int(torch.cuda.memory_allocated())
+    except Exception:
+        pass
+    return 0
+
+
+class _Entry:
+    def __init__(self, model, mem_bytes, load_s, warmup_s):
+        self.model = model
+        self.mem_bytes = mem_bytes
+        self.load_s = load_s
+        self.warmup_s = warmup_s
+        self.last_used = time.time()
+
+
+class ModelPool:
+    """
+    Pool model yang dimuat sekali per proses.
+
+    Model didaftarkan dengan `register(name, loader, warmup)`. `get(name)` memuat model
+    pada pemakaian pertama (lalu warm-up), dan setelahnya selalu mengembalikan objek yang sama.
+    """
+
+    def __init__(self, memory_limit_mb: float = MEMORY_LIMIT_MB, warmup: bool = WARMUP_ON_LOAD):
+        self.memory_limit = int(memory_limit_mb * 1024 * 1024)
+        self.warmup = warmup
+        self._loaders = {}
+        self._entries = OrderedDict()  # urutan = LRU (paling lama di depan)
+        self._lock = threading.RLock()
+
+    def register(self, name: str, loader, warmup=None, unloader=None):
+        """Daftarkan loader (tanpa argumen) dan warm-up opsional (menerima model)."""
+        self._loaders[name] = (loader, warmup, unloader)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._entries
+
+    def get(self, name: str):
+        """Ambil model; load + warm-up kalau belum resident."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = self._load(name)
+            entry.last_used = time.time()
+            self._entries.move_to_end(name)
+            return entry.model
+
+    def preload(self, names=None):
+        """Muat beberapa model sekaligus saat startup."""
+        for name in names or list(self._loaders):
+            self.get(name)
+
+    def unload(self, name: str):
+        with self._lock:
+            entry = self._entries.pop(name, None)
+            if entry is None:
+                return
+            _, _, unloader = self._loaders[name]
+            if unloader is not None:
+                try:
+                    unloader(entry.model)
+                except Exception as e:
+                    print(f"[ModelPool] Warning: unload {name} gagal: {e}")
+            del entry
+            gc.collect()
+            try:
+                import torch
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            except Exception:
+                pass
+            print(f"[ModelPool] Unload: {name}")
+
+    def memory_report(self) -> dict:
+        """Ringkasan per model: memori (MB), waktu load dan warm-up (detik)."""
+        with self._lock:
+            return {
+                name: {
+                    "memory_mb": round(e.mem_bytes / (1024 * 1024), 1),
+                    "load_s": round(e.load_s, 3),
+                    "warmup_s": round(e.warmup_s, 3),
+                    "last_used": e.last_used,
+                }
+                for name, e in self._entries.items()
+            }
+
+    def total_memory(self) -> int:
+        return sum(e.mem_bytes for e in self._entries.values())
+
+    def print_report(self):
+        print("=== MODEL POOL ===")
+        for name, info in self.memory_report().items():
+            print(f"{name:10s}: {info['memory_mb']:8.1f} MB | "
+                  f"load {info['load_s']:6.3f}s | warm-up {info['warmup_s']:6.3f}s")
+        print(f"{'TOTAL':10s}: {self.total_memory() / (1024 * 1024):8.1f} MB")
+
+    def _load(self, name: str) -> _Entry:
+        if name not in self._loaders:
+            raise KeyError(f"Model tidak terdaftar di pool: {name}")
+        loader, warmup, _ = self._loaders[name]
+
+        print(f"[ModelPool] Memuat {name}...")
+        rss0, cuda0 = _rss_bytes(), _cuda_bytes()
+        t0 = time.perf_counter()
+        model = loader()
+        load_s = time.perf_counter() - t0
+
+        warmup_s = 0.0
+        if self.warmup and warmup is not None:
+            t0 = time.perf_counter()
+            try:
+                warmup(model)
+            except Exception as e:
+                print(f"[ModelPool] Warning: warm-up {name} gagal: {e}")
+            warmup_s = time.perf_counter() - t0
+
+        mem = max(0, _rss_bytes() - rss0) + max(0, _cuda_bytes() - cuda0)
+        entry = _Entry(model, mem, load_s, warmup_s)
+        self._entries[name] = entry
+        print(f"[ModelPool] {name} siap: {mem / (1024 * 1024):.1f} MB, "
+              f"load {load_s:.3f}s, warm-up {warmup_s:.3f}s")
+
+        self._enforce_limit(keep=name)
+        return entry
+
+    def _enforce_limit(self, keep: str):
+        if self.memory_limit <= 0:
+            return
+        while self.total_memory() > self.memory_limit:
+            victims = [n for n in self._entries if n != keep]
+            if not victims:
+                break
+            self.unload(victims[0])
+
+
+# ===== LOADER BAWAAN =====
+def _load_fastsam():
+    from segmentation import load_fastsam
+    return load_fastsam()
+
+
+def _warmup_fastsam(model):
+    import numpy as np
+    from segmentation import model_device
+    dummy = np.zeros((720, 1280, 3), dtype=np.uint8)
+    model.predict(source=dummy, imgsz=640, conf=0.4, device=model_device(model),
+                  save=False, verbose=False)
+
+
+def _load_piper():
+    from tts_piper import PiperTTSEngine
+    return PiperTTSEngine()
+
+
+def _warmup_piper(engine):
+    engine.synthesize_pcm("Siap.")
+
+
+def _load_argos():
+    from translator_argos import load_argos_translation
+    return load_argos_translation()
+
+
+def _warmup_argos(translation):
+    translation.translate("Ready.")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ModelPool:
+    """Pool global (singleton) dengan FastSAM, Piper, dan Argos terdaftar."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ModelPool()
+            _pool.register("fastsam", _load_fastsam, _warmup_fastsam)
+            _pool.register("argos", _load_argos, _warmup_argos)
+            _pool.register("piper", _load_piper, _warmup_piper)
+        return _pool
@@ -0,0 +1,126 @@
+# resources.py
+# Budget thread CPU terpusat. FastSAM (torch), pre-processing (OpenCV), Piper (onnxruntime)
+# dan Argos (CTranslate2) masing-masing membuat thread pool seukuran semua core; saat tahap
+# executor berjalan bersamaan, core Jetson jadi oversubscribed. Modul ini memberi setiap
+# engine jumlah thread intra-op eksplisit dan (opsional) CPU affinity per thread tahap.
+#
+# Konfigurasi per deployment lewat konstanta di bawah atau env (engine yang tidak disebut
+# tetap memakai default library-nya; tanpa konfigurasi sama sekali tidak ada yang diubah):
+#   VISION_THREADS="torch=2,opencv=2,piper=1,argos=1"
+#   VISION_AFFINITY="segment=0-1;stream=2-3"
+
+import os
+
+# ====== KONFIG ======
+THREAD_BUDGET = {}          # mis. Jetson 4 core: {"torch": 2, "opencv": 2, "piper": 1, "argos": 1}
+AFFINITY = {}               # nama tahap executor -> daftar core, mis. {"segment": [0, 1]}
+ENGINES = ("torch", "opencv", "piper", "argos")
+
+_applied = {}
+
+
+def parse_threads(spec: str) -> dict:
+    """'torch=2,opencv=1' -> {'torch': 2, 'opencv': 1}"""
+    out = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, n = part.partition("=")
+        name = name.strip()
+        if name not in ENGINES:
+            raise ValueError(f"Engine tidak dikenal: {name} (pilihan: {ENGINES})")
+        out[name] = int(n)
+    return out
+
+
+def parse_cpus(spec: str) -> list:
+    """'0-1,3' -> [0, 1, 3]"""
+    cpus = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        lo, _, hi = part.partition("-")
+        cpus.extend(range(int(lo), int(hi or lo) + 1))
+    return cpus
+
+
+def parse_affinity(spec: str) -> dict:
+    """'segment=0-1;stream=2-3' -> {'segment': [0, 1], 'stream': [2, 3]}"""
+    out = {}
+    for part in filter(None, (p.strip() for p in spec.split(";"))):
+        name, _, cpus = part.partition("=")
+        out[name.strip()] = parse_cpus(cpus)
+    return out
+
+
+def thread_budget() -> dict:
+    """Budget efektif: THREAD_BUDGET ditimpa env VISION_THREADS."""
+    budget = dict(THREAD_BUDGET)
+    budget.update(parse_threads(os.environ.get("VISION_THREADS", "")))
+    return budget
+
+
+def stage_affinity() -> dict:
+    affinity = dict(AFFINITY)
+    affinity.update(parse_affinity(os.environ.get("VISION_AFFINITY", "")))
+    return affinity
+
+
+def apply_thread_budget(budget: dict = None) -> dict:
+    """
+    Terapkan jumlah thread ke torch dan OpenCV sekarang, dan simpan nilai untuk Piper/Argos
+    (dipakai saat session/translator dibuat: engine_threads("piper"/"argos")).
+    Hanya engine yang dikonfigurasi yang diubah. Panggil sebelum model dimuat.
+    """
+    budget = dict(thread_budget(), **(budget or {}))
+    _applied.clear()
+    _applied.update(budget)
+    if not budget:
+        print("[Resources] Thread: default library (THREAD_BUDGET / VISION_THREADS tidak diisi)")
+        return budget
+
+    if "torch" in budget:
+        try:
+            import torch
+            torch.set_num_threads(budget["torch"])
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                pass  # hanya bisa sekali, sebelum ada kerja paralel
+        except ImportError:
+            pass
+    if "opencv" in budget:
+        import cv2
+        cv2.setNumThreads(budget["opencv"])
+
+    print("[Resources] Thread: " + ", ".join(f"{k}={v}" for k, v in budget.items()))
+    return budget
+
+
+def engine_threads(name: str):
+    """Thread intra-op engine (piper/argos) yang dibuat sendiri; None -> default library."""
+    return _applied.get(name) or thread_budget().get(name)
+
+
+def onnx_session_options(intra_threads: int):
+    """SessionOptions onnxruntime dengan thread pool terbatas."""
+    import onnxruntime
+    opts = onnxruntime.SessionOptions()
+    opts.intra_op_num_threads = intra_threads
+    opts.inter_op_num_threads = 1
+    opts.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    return opts
+
+
+def pin_current_thread(name: str) -> list:
+    """
+    CPU affinity untuk thread pemanggil (Linux). Dipakai sebagai init worker executor.
+    Return daftar core yang dipasang (kosong jika tidak dikonfigurasi / tidak didukung).
+    """
+    cpus = stage_affinity().get(name)
+    if not cpus or not hasattr(os, "sched_setaffinity"):
+        return []
+    try:
+        # pid 0 = thread pemanggil (affinity di Linux berlaku per thread)
+        os.sched_setaffinity(0, cpus)
+    except OSError as e:
+        print(f"[Resources] Affinity {name} -> {cpus} gagal: {e}")
+        return []
+    print(f"[Resources] Tahap {name} dipin ke core {cpus}")
+    return cpus
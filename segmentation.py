@@ -1,9 +1,11 @@
-from ultralytics import FastSAM
 import os, cv2, numpy as np
 import json
+from tracing import span
 
 # ====== KONFIG ======
 WEIGHTS     = "models/FastSAM-x.pt"
+SEG_BACKEND = os.environ.get("SEG_BACKEND", "torch")   # "torch" | "onnx" | "onnx-int8"
+SEG_BACKENDS = ("torch", "onnx", "onnx-int8")
 AREA_THRESH = 5000
 TOP_K       = 10
 MAX_AREA_RATIO = 0.50
@@ -13,35 +15,204 @@ MIN_THIN_PX    = 40
 SOLID_MIN      = 0.55
 TOP_BORDER_PAD = 20
 NMS_IOU        = 0.5
+NMS_MODE       = "box"   # "box" (IoU bbox) | "mask" (IoU mask resolusi rendah, objek bersarang tidak digabung)
+NMS_MASK_SIZE  = 160     # sisi terpanjang mask untuk mode "mask"
+LOWRES_MASKS   = True    # True -> filter/NMS di mask resolusi model, hanya objek terpilih yang di-upsample
+MAX_DET        = 100     # batas jumlah mask mentah dari FastSAM
+SEG_CONF       = 0.4     # confidence minimum FastSAM
+SOLID_DOWNSCALE = 1      # >1 -> solidity dihitung di mask yang di-subsample (lebih cepat)
+SAVE_DEBUG     = False   # True -> tulis preprocessed/segmented/bbox PNG + JSON ke SAVE_DIR
 
 SAVE_DIR = os.path.join(os.getcwd(), "runs", "fastsam_near")
 CROP_DIR = os.path.join(SAVE_DIR, "crops")
 
 
-def preprocess_image(image_path: str) -> str:
-    """Simple pre-processing: denoise + sharpen + auto-brightness"""
-    img = cv2.imread(image_path)
-    
-    # 1. Denoise
-    img = cv2.fastNlMeansDenoisingColored(img, None, 5, 5, 7, 21)
-    
-    # 2. Auto brightness/contrast (CLAHE)
+def get_device(backend: str = None):
+    """
+    Device inferensi FastSAM: GPU 0 jika torch melihat CUDA, selain itu CPU.
+    onnx-int8 selalu CPU (ConvInteger hasil kuantisasi hanya ada di CPU provider onnxruntime).
+    """
+    if (backend or SEG_BACKEND) == "onnx-int8":
+        return 'cpu'
+    try:
+        import torch
+        return 0 if torch.cuda.is_available() else 'cpu'
+    except ImportError:
+        return 'cpu'
+
+
+def _is_stale(artifact: str, source: str) -> bool:
+    if not os.path.exists(artifact):
+        return True
+    if not os.path.exists(source):
+        return False  # deployment hanya membawa artefak (tanpa .pt / .onnx sumber)
+    return os.path.getmtime(artifact) < os.path.getmtime(source)
+
+
+def backend_weights(backend: str = None, imgsz: int = None) -> str:
+    """
+    Path bobot FastSAM untuk backend yang dipilih. Artefak ONNX di-export sekali dan
+    di-cache di samping WEIGHTS (models/); export ulang hanya jika .pt lebih baru.
+    Export memakai ukuran input tetap, jadi imgsz masuk ke nama file: ganti imgsz ->
+    file baru, bukan file lama dengan dimensi input yang salah. Batch juga tetap 1
+    (batch.py memakai batch 1 untuk backend ONNX). Artefak tanpa file sumbernya
+    (mis. hanya .int8.onnx yang di-deploy) dipakai apa adanya.
+
+        torch     -> models/FastSAM-x.pt
+        onnx      -> models/FastSAM-x-640.onnx         (FastSAM.export(format="onnx"))
+        onnx-int8 -> models/FastSAM-x-640.int8.onnx    (onnxruntime quantize_dynamic, bobot INT8)
+    """
+    backend = backend or SEG_BACKEND
+    imgsz = imgsz or MODEL_IMGSZ
+    if backend not in SEG_BACKENDS:
+        raise ValueError(f"SEG_BACKEND tidak dikenal: {backend} (pilihan: {SEG_BACKENDS})")
+    if backend == "torch":
+        return WEIGHTS
+
+    onnx_path = f"{os.path.splitext(WEIGHTS)[0]}-{imgsz}.onnx"
+    int8_path = f"{os.path.splitext(WEIGHTS)[0]}-{imgsz}.int8.onnx"
+    if backend == "onnx-int8" and os.path.exists(int8_path) and not os.path.exists(onnx_path):
+        return int8_path
+    if _is_stale(onnx_path, WEIGHTS):
+        from ultralytics import FastSAM
+        print(f"[Segmentasi] Export ONNX {WEIGHTS} (imgsz {imgsz})...")
+        exported = FastSAM(WEIGHTS).export(format="onnx", imgsz=imgsz, simplify=True, dynamic=False)
+        if os.path.abspath(exported) != os.path.abspath(onnx_path):
+            os.replace(exported, onnx_path)
+    if backend == "onnx":
+        return onnx_path
+
+    if _is_stale(int8_path, onnx_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        print(f"[Segmentasi] Kuantisasi INT8 {onnx_path}...")
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+    return int8_path
+
+
+def load_fastsam(backend: str = None):
+    """Muat FastSAM untuk backend tertentu (Ultralytics memakai onnxruntime untuk file .onnx)."""
+    from ultralytics import FastSAM
+    model = FastSAM(backend_weights(backend))
+    model.seg_backend = backend or SEG_BACKEND   # dibaca model_device()
+    return model
+
+
+def model_device(model):
+    """Device untuk model hasil load_fastsam (backend dibawa model, bukan hanya SEG_BACKEND)."""
+    return get_device(getattr(model, "seg_backend", None))
+
+
+def load_image(image):
+    """Terima path gambar atau ndarray BGR, kembalikan ndarray BGR."""
+    if isinstance(image, np.ndarray):
+        return image
+    img = cv2.imread(image)
+    if img is None:
+        raise FileNotFoundError(f"Gambar tidak bisa dibaca: {image}")
+    return img
+
+
+# ====== PRE-PROCESSING ======
+PREPROCESS_PROFILE = "auto"  # "off" | "fast" | "quality" | "auto"
+PREPROCESS_PROFILES = ("off", "fast", "quality", "auto")
+MODEL_IMGSZ     = 640    # resolusi input FastSAM (sisi terpanjang)
+NOISE_SIGMA_MAX = 3.0    # auto: estimasi noise di atas ini -> denoise
+DARK_MEAN       = 90     # auto: rata-rata luminance di bawah ini -> CLAHE
+LOW_CONTRAST    = 40     # auto: std luminance di bawah ini -> CLAHE
+
+# Dibuat sekali, bukan setiap frame
+_CLAHE = cv2.createCLAHE(clipLimit=1.5, tileGridSize=(8, 8))
+_SHARPEN_KERNEL = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]], dtype=np.float32)
+_NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+
+
+def resize_to_model(img, imgsz: int = MODEL_IMGSZ) -> np.ndarray:
+    """Perkecil gambar agar sisi terpanjang = imgsz (tidak pernah memperbesar)."""
+    h, w = img.shape[:2]
+    scale = imgsz / max(h, w)
+    if scale >= 1.0:
+        return img
+    return cv2.resize(img, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+
+
+def analyze_frame(img) -> dict:
+    """
+    Statistik murah untuk mode auto (dihitung di gambar kecil):
+    noise (sigma, metode Immerkaer), brightness (mean L), contrast (std L).
+    """
+    small = resize_to_model(img, 320)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    h, w = gray.shape
+    lap = cv2.filter2D(gray.astype(np.float32), -1, _NOISE_KERNEL)
+    sigma = float(np.abs(lap[1:-1, 1:-1]).sum() * np.sqrt(0.5 * np.pi) / (6.0 * (w - 2) * (h - 2)))
+    mean, std = cv2.meanStdDev(gray)
+    return {"noise": sigma, "brightness": float(mean[0][0]), "contrast": float(std[0][0])}
+
+
+def _denoise_quality(img):
+    return cv2.fastNlMeansDenoisingColored(img, None, 5, 5, 7, 21)
+
+
+def _denoise_fast(img):
+    return cv2.bilateralFilter(img, 5, 25, 5)
+
+
+def _clahe(img):
     lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
     l, a, b = cv2.split(lab)
-    clahe = cv2.createCLAHE(clipLimit=1.5, tileGridSize=(8, 8))
-    l = clahe.apply(l)
-    img = cv2.cvtColor(cv2.merge([l, a, b]), cv2.COLOR_LAB2BGR)
+    l = _CLAHE.apply(l)
+    return cv2.cvtColor(cv2.merge([l, a, b]), cv2.COLOR_LAB2BGR)
+
+
+def _sharpen(img):
+    return cv2.filter2D(img, -1, _SHARPEN_KERNEL)
+
+
+def preprocess_image(image, save_debug: bool = False, profile: str = None, imgsz: int = None) -> np.ndarray:
+    """
+    Pre-processing sebelum segmentasi (ndarray in -> ndarray out).
+
+    Profile:
+        off     : tanpa pre-processing
+        fast    : perkecil ke resolusi model, denoise ringan (bilateral) + CLAHE + sharpen
+        quality : resolusi penuh, fastNlMeans + CLAHE + sharpen (perilaku lama, lambat)
+        auto    : seperti fast, tapi denoise/CLAHE hanya jika frame memang noisy/gelap
+
+    Output profile fast/auto berukuran resolusi model (imgsz, default MODEL_IMGSZ);
+    segment_objects menskalakan koordinat kembali ke frame asli.
+    """
+    profile = profile or PREPROCESS_PROFILE
+    imgsz = imgsz or MODEL_IMGSZ
+    if profile not in PREPROCESS_PROFILES:
+        raise ValueError(f"Profile pre-processing tidak dikenal: {profile}")
+    img = load_image(image)
     
-    # 3. Sharpen
-    kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
-    img = cv2.filter2D(img, -1, kernel)
+    if profile == "quality":
+        img = _sharpen(_clahe(_denoise_quality(img)))
+    elif profile == "fast":
+        img = _sharpen(_clahe(_denoise_fast(resize_to_model(img, imgsz))))
+    elif profile == "auto":
+        img = resize_to_model(img, imgsz)
+        stats = analyze_frame(img)
+        steps = []
+        if stats["noise"] > NOISE_SIGMA_MAX:
+            img = _denoise_fast(img)
+            steps.append("denoise")
+        if stats["brightness"] < DARK_MEAN or stats["contrast"] < LOW_CONTRAST:
+            img = _clahe(img)
+            steps.append("clahe")
+        img = _sharpen(img)
+        steps.append("sharpen")
+        print(f"[Pre-processing] auto: noise={stats['noise']:.1f} "
+              f"brightness={stats['brightness']:.0f} contrast={stats['contrast']:.0f} -> {'+'.join(steps)}")
     
-    # Save
-    processed_path = os.path.join(SAVE_DIR, "preprocessed.png")
-    cv2.imwrite(processed_path, img)
-    print(f"[Pre-processing] Done: {processed_path}")
+    # Save (debug saja)
+    if save_debug:
+        processed_path = os.path.join(SAVE_DIR, "preprocessed.png")
+        cv2.imwrite(processed_path, img)
+        print(f"[Pre-processing] Done ({profile}): {processed_path}")
     
-    return processed_path
+    return img
 
 
 def solidity(mask):
@@ -54,6 +225,83 @@ def solidity(mask):
     hull_area = cv2.contourArea(hull)
     return float(area / hull_area) if hull_area > 1e-6 else 0.0
 
+def _to_numpy(x):
+    """Tensor torch (CPU/GPU) atau ndarray -> ndarray."""
+    if hasattr(x, "cpu"):
+        x = x.cpu().numpy()
+    return np.asarray(x)
+
+
+def upsample_mask(mask, W: int, H: int) -> np.ndarray:
+    """
+    Kembalikan satu mask (resolusi model, letterbox) ke ukuran frame (W, H):
+    buang padding letterbox lalu resize nearest. Mask yang sudah seukuran frame dikembalikan apa adanya.
+    """
+    mh, mw = mask.shape[:2]
+    if (mh, mw) == (H, W):
+        return mask
+    gain = min(mh / H, mw / W)
+    pad_w, pad_h = (mw - W * gain) / 2, (mh - H * gain) / 2
+    top, left = int(round(pad_h - 0.1)), int(round(pad_w - 0.1))
+    bottom, right = mh - int(round(pad_h + 0.1)), mw - int(round(pad_w + 0.1))
+    return cv2.resize(mask[top:bottom, left:right], (W, H), interpolation=cv2.INTER_NEAREST)
+
+
+def mask_scale(mask_shape, W: int, H: int) -> float:
+    """Jumlah piksel frame (linear) per piksel mask, untuk mask letterbox maupun retina."""
+    mh, mw = mask_shape[-2:]
+    return 1.0 / min(mh / H, mw / W)
+
+
+def filter_candidates(masks, boxes, scores, W, H, scale=1.0, solid_downscale=None):
+    """
+    Filter bentuk untuk semua mask sekaligus.
+
+    Area, rasio area, coverage, aspect ratio, dan border atas dihitung vektor (batch)
+    langsung di tensor/array mask; solidity (findContours + convexHull) hanya
+    dijalankan untuk mask yang lolos filter murah.
+
+    Args:
+        masks: tensor/ndarray (N, h, w) berisi 0/1
+        boxes: ndarray (N, 4) xyxy dalam koordinat frame asli
+        scores: ndarray (N,)
+        W, H: ukuran frame asli
+        scale: piksel frame per piksel mask (lihat mask_scale; area dikali scale^2)
+        solid_downscale: faktor subsample mask untuk solidity (default SOLID_DOWNSCALE)
+
+    Returns:
+        list (score, area, (x1, y1, x2, y2), index_mask)
+    """
+    d = SOLID_DOWNSCALE if solid_downscale is None else solid_downscale
+    if len(boxes) == 0:
+        return []
+
+    areas = _to_numpy(masks.sum((1, 2))).astype(np.float64) * scale * scale
+    b = boxes.astype(int)
+    x1, y1, x2, y2 = b[:, 0], b[:, 1], b[:, 2], b[:, 3]
+    bw = np.maximum(1, x2 - x1)
+    bh = np.maximum(1, y2 - y1)
+    cover_w = bw / W
+    cover_h = bh / H
+    ar = np.maximum(bw, bh) / np.maximum(1, np.minimum(bw, bh))
+
+    ok = areas >= AREA_THRESH
+    ok &= ~((areas / (W * H) > MAX_AREA_RATIO) | ((cover_w > MAX_COVER_WH) & (cover_h > MAX_COVER_WH)))
+    ok &= ~((ar > AR_MAX) & ((bw < MIN_THIN_PX) | (bh < MIN_THIN_PX)))
+    ok &= ~((y1 <= TOP_BORDER_PAD) & (cover_w > 0.8))
+
+    cand = []
+    for i in np.flatnonzero(ok):
+        m = _to_numpy(masks[i]).astype(np.uint8)
+        if d > 1:
+            m = np.ascontiguousarray(m[::d, ::d])
+        if solidity(m) < SOLID_MIN:
+            continue
+        cand.append((float(scores[i]), int(areas[i]),
+                     (int(x1[i]), int(y1[i]), int(x2[i]), int(y2[i])), int(i)))
+    return cand
+
+
 def iou(a, b):
     """Intersection over Union untuk NMS"""
     ax1, ay1, ax2, ay2 = a
@@ -66,6 +314,72 @@ def iou(a, b):
     return inter/ua if ua > 0 else 0.0
 
 
+def box_iou_matrix(boxes) -> np.ndarray:
+    """Matriks IoU (N, N) untuk box xyxy, dihitung sekaligus (rumus sama dengan iou())."""
+    b = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    ix1 = np.maximum(b[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(b[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(b[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(b[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area[:, None] + area[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def mask_iou_matrix(masks, max_side: int = NMS_MASK_SIZE) -> np.ndarray:
+    """Matriks IoU (N, N) antar mask, dihitung di mask yang di-subsample ke ~max_side."""
+    step = max(1, int(np.ceil(max(masks.shape[1:]) / max_side)))
+    m = _to_numpy(masks[:, ::step, ::step])
+    flat = (m > 0).reshape(len(m), -1).astype(np.float32)
+    inter = flat @ flat.T
+    area = flat.sum(1)
+    union = area[:, None] + area[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def nms(cand, masks=None, iou_thresh: float = NMS_IOU, mode: str = None, top_k: int = TOP_K):
+    """
+    NMS vektor untuk kandidat dari filter_candidates.
+
+    Kandidat diurutkan (score, area) menurun, matriks IoU dihitung sekali, lalu
+    kandidat yang overlap >= iou_thresh dengan objek yang sudah dipilih dibuang.
+
+    Args:
+        cand: list (score, area, (x1, y1, x2, y2), index_mask)
+        masks: tensor/ndarray semua mask (wajib untuk mode "mask")
+        mode: "box" atau "mask" (default NMS_MODE)
+        top_k: jumlah maksimum objek yang dipertahankan
+
+    Returns:
+        list kandidat yang dipertahankan (urutan prioritas)
+    """
+    mode = mode or NMS_MODE
+    if not cand:
+        return []
+    cand = sorted(cand, key=lambda x: (x[0], x[1]), reverse=True)
+
+    if mode == "mask":
+        if masks is None:
+            raise ValueError("NMS mode 'mask' butuh masks")
+        ious = mask_iou_matrix(masks[[c[3] for c in cand]])
+    elif mode == "box":
+        ious = box_iou_matrix([c[2] for c in cand])
+    else:
+        raise ValueError(f"NMS mode tidak dikenal: {mode}")
+
+    suppressed = np.zeros(len(cand), dtype=bool)
+    kept = []
+    for j in range(len(cand)):
+        if suppressed[j]:
+            continue
+        kept.append(cand[j])
+        if len(kept) >= top_k:
+            break
+        suppressed |= ious[j] >= iou_thresh
+    return kept
+
+
 def analyze_position(x1, y1, x2, y2, img_width, img_height):
     """Analisis posisi objek: left/center/right dan near/medium/far"""
     center_x = (x1 + x2) / 2
@@ -114,141 +428,160 @@ def add_position_overlay(image_path: str, segments_data: list) -> str:
     cv2.imwrite(overlay_path, img)
     return overlay_path
 
-def segment_objects(image_path: str, model=None, use_preprocess=True):
+def extract_objects(r, W: int, H: int, scale: float = 1.0):
+    """
+    Filter + NMS + analisis posisi untuk satu hasil FastSAM.
+
+    Args:
+        r: satu elemen hasil model.predict
+        W, H: ukuran frame asli (koordinat output)
+        scale: frame asli / gambar input model
+
+    Returns:
+        (objects_info, kept, masks). masks None jika FastSAM tidak menghasilkan mask.
+    """
+    if r.masks is None:
+        return [], [], None
+
+    # Box dalam koordinat frame asli; mask tetap di tensor (resolusi model / input)
+    # sampai lolos filter
+    masks  = r.masks.data
+    boxes  = r.boxes.xyxy.cpu().numpy() * scale
+    scores = r.boxes.conf.cpu().numpy()
+
+    # Filter objek (vektor)
+    with span("segment.filter") as sp:
+        cand = filter_candidates(masks, boxes, scores, W, H, mask_scale(masks.shape, W, H))
+        sp.set(candidates=len(boxes), kept=len(cand))
+    if not cand:
+        return [], [], masks
+
+    # NMS (vektor)
+    with span("segment.nms"):
+        kept = nms(cand, masks)
+
+    # Analisis posisi
+    objects_info = []
+    for idx, (score, area, (x1, y1, x2, y2), mi) in enumerate(kept, 1):
+        h_pos, v_pos = analyze_position(x1, y1, x2, y2, W, H)
+        objects_info.append({
+            'id': idx,
+            'area': area,
+            'bbox': [int(x1), int(y1), int(x2), int(y2)],
+            'h_position': h_pos,
+            'v_position': v_pos,
+            'score': float(score)
+        })
+    return objects_info, kept, masks
+
+
+def segment_objects(image, model=None, use_preprocess=True, save_debug=None, profile=None,
+                    lowres_masks=None, imgsz=None, conf=None):
     """
     Melakukan segmentasi objek dekat.
     
     Args:
-        image_path: Path ke gambar
+        image: Path ke gambar atau ndarray BGR (frame kamera langsung)
         model: FastSAM model (optional)
         use_preprocess: True untuk pre-process gambar dulu
+        profile: profile pre-processing ("off"/"fast"/"quality"/"auto", default PREPROCESS_PROFILE)
+        save_debug: True untuk menulis PNG/JSON ke SAVE_DIR (default: SAVE_DEBUG)
+        lowres_masks: True -> mask tetap di resolusi model; hanya <= TOP_K mask terpilih
+                      yang di-upsample (default: LOWRES_MASKS)
+        imgsz, conf: resolusi input dan confidence FastSAM (default MODEL_IMGSZ, SEG_CONF)
     
     Returns:
-        dict: Info objek terdeteksi
+        dict: Info objek terdeteksi + 'segmented_image'/'bbox_image' (ndarray).
+              Path gambar hanya terisi jika save_debug aktif.
     """
-    os.makedirs(SAVE_DIR, exist_ok=True)
-    os.makedirs(CROP_DIR, exist_ok=True)
+    save_debug = SAVE_DEBUG if save_debug is None else save_debug
+    lowres_masks = LOWRES_MASKS if lowres_masks is None else lowres_masks
+    imgsz = imgsz or MODEL_IMGSZ
+    conf = SEG_CONF if conf is None else conf
+    if save_debug:
+        os.makedirs(SAVE_DIR, exist_ok=True)
+        os.makedirs(CROP_DIR, exist_ok=True)
     
-    # Pre-process jika diminta
+    # Pre-process jika diminta (semua di memori)
+    frame = load_image(image)
     if use_preprocess:
-        input_path = preprocess_image(image_path)
+        with span("segment.preprocess"):
+            input_img = preprocess_image(frame, save_debug=save_debug, profile=profile, imgsz=imgsz)
     else:
-        input_path = image_path
+        input_img = frame
     
-    # Load model
+    # Skala input -> frame asli (profile fast/auto memperkecil gambar)
+    scale = frame.shape[1] / input_img.shape[1]
+    
+    # Ambil model resident dari pool (dimuat sekali per proses)
     if model is None:
-        model = FastSAM(WEIGHTS)
+        from model_pool import get_pool
+        model = get_pool().get("fastsam")
     
-    results = model.predict(
-        source=input_path,
-        imgsz=640,
-        conf=0.4,
-        iou=0.7,
-        retina_masks=True,
-        device=0 if cv2.cuda.getCudaEnabledDeviceCount() > 0 else 'cpu',
-        save=False
-    )
+    with span("segment.predict"):
+        results = model.predict(
+            source=input_img,
+            imgsz=imgsz,
+            conf=conf,
+            iou=0.7,
+            retina_masks=not lowres_masks,
+            max_det=MAX_DET,
+            device=model_device(model),
+            save=False
+        )
     
     objects_info = []
+    segmented = None
+    vis = None
     segmented_path = None
     bbox_path = None
     
     for r in results:
-        img = r.orig_img.copy()
-        if r.masks is None:
-            print("Tidak ada mask.")
-            break
-
+        # Render di gambar input jika resolusinya sama; kalau diperkecil, render di frame asli
+        img = r.orig_img.copy() if scale == 1.0 else frame.copy()
         H, W = img.shape[:2]
-        frame_area = H * W
-
-        masks  = r.masks.data.cpu().numpy().astype(np.uint8)
-        boxes  = r.boxes.xyxy.cpu().numpy()
-        scores = r.boxes.conf.cpu().numpy()
-
-        # Filter objek
-        cand = []
-        for i, m in enumerate(masks):
-            area = int(m.sum())
-            if area < AREA_THRESH:
-                continue
-
-            x1, y1, x2, y2 = boxes[i].astype(int)
-            bw, bh = max(1, x2-x1), max(1, y2-y1)
 
-            area_ratio = area / frame_area
-            cover_w = bw / W
-            cover_h = bh / H
-            if area_ratio > MAX_AREA_RATIO or (cover_w > MAX_COVER_WH and cover_h > MAX_COVER_WH):
-                continue
-
-            ar = max(bw, bh) / max(1, min(bw, bh))
-            if ar > AR_MAX and (bw < MIN_THIN_PX or bh < MIN_THIN_PX):
-                continue
-
-            if y1 <= TOP_BORDER_PAD and cover_w > 0.8:
-                continue
+        objects_info, kept, masks = extract_objects(r, W, H, scale)
+        if masks is None:
+            print("Tidak ada mask.")
+            break
+        if not kept:
+            print("Tidak ada objek valid setelah filter bentuk.")
+            break
 
-            if solidity(m) < SOLID_MIN:
-                continue
+        with span("segment.render"):
+            # Visual bbox
+            vis = img.copy()
+            for obj in objects_info:
+                x1, y1, x2, y2 = obj['bbox']
+                cv2.rectangle(vis, (x1, y1), (x2, y2), (0, 255, 255), 2)
+                label = f"#{obj['id']} {obj['h_position']}-{obj['v_position']}"
+                cv2.putText(vis, label, (x1, max(20, y1-6)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,255), 2, cv2.LINE_AA)
 
-            cand.append((float(scores[i]), area, (x1, y1, x2, y2), i))
+            # Segmented image: hanya mask terpilih yang di-upsample ke resolusi frame
+            union_mask = np.zeros((H, W), dtype=np.uint8)
+            for _, _, _, mi in kept:
+                m = _to_numpy(masks[mi]).astype(np.uint8) * 255
+                union_mask = cv2.bitwise_or(union_mask, upsample_mask(m, W, H))
 
-        if not cand:
-            print("Tidak ada objek valid setelah filter bentuk.")
-            break
+            fg = cv2.bitwise_and(img, img, mask=union_mask)
+            bg = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            bg = cv2.cvtColor(bg, cv2.COLOR_GRAY2BGR)
+            bg = (bg * 0.25).astype(np.uint8)
+            inv_mask = cv2.bitwise_not(union_mask)
+            bg_masked = cv2.bitwise_and(bg, bg, mask=inv_mask)
+            segmented = cv2.add(fg, bg_masked)
 
-        # NMS
-        cand.sort(key=lambda x: (x[0], x[1]), reverse=True)
-        kept = []
-        for c in cand:
-            _, _, box_c, _ = c
-            if all(iou(box_c, box_k) < NMS_IOU for _, _, box_k, _ in kept):
-                kept.append(c)
-        kept = kept[:TOP_K]
-
-        # Analisis posisi
-        for idx, (score, area, (x1, y1, x2, y2), mi) in enumerate(kept, 1):
-            h_pos, v_pos = analyze_position(x1, y1, x2, y2, W, H)
-            objects_info.append({
-                'id': idx,
-                'area': area,
-                'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                'h_position': h_pos,
-                'v_position': v_pos,
-                'score': float(score)
-            })
-
-        # Visual bbox
-        vis = img.copy()
-        for obj in objects_info:
-            x1, y1, x2, y2 = obj['bbox']
-            cv2.rectangle(vis, (x1, y1), (x2, y2), (0, 255, 255), 2)
-            label = f"#{obj['id']} {obj['h_position']}-{obj['v_position']}"
-            cv2.putText(vis, label, (x1, max(20, y1-6)),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,255), 2, cv2.LINE_AA)
-        bbox_path = os.path.join(SAVE_DIR, "bbox_near.png")
-        cv2.imwrite(bbox_path, vis)
-
-        # Segmented image
-        union_mask = np.zeros((H, W), dtype=np.uint8)
-        for _, _, _, mi in kept:
-            union_mask = cv2.bitwise_or(union_mask, (masks[mi] * 255))
-
-        fg = cv2.bitwise_and(img, img, mask=union_mask)
-        bg = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        bg = cv2.cvtColor(bg, cv2.COLOR_GRAY2BGR)
-        bg = (bg * 0.25).astype(np.uint8)
-        inv_mask = cv2.bitwise_not(union_mask)
-        bg_masked = cv2.bitwise_and(bg, bg, mask=inv_mask)
-        segmented = cv2.add(fg, bg_masked)
-
-        segmented_path = os.path.join(SAVE_DIR, "segmented.png")
-        cv2.imwrite(segmented_path, segmented)
-        
         print(f"[OK] Ditemukan {len(objects_info)} objek")
-        print(f"[OK] Segmented: {segmented_path}")
-        print(f"[OK] Bbox: {bbox_path}")
+        if save_debug:
+            with span("segment.write"):
+                bbox_path = os.path.join(SAVE_DIR, "bbox_near.png")
+                cv2.imwrite(bbox_path, vis)
+                segmented_path = os.path.join(SAVE_DIR, "segmented.png")
+                cv2.imwrite(segmented_path, segmented)
+            print(f"[OK] Segmented: {segmented_path}")
+            print(f"[OK] Bbox: {bbox_path}")
         break
     
     result = {
@@ -257,12 +590,15 @@ def segment_objects(image_path: str, model=None, use_preprocess=True):
         'objects': objects_info
     }
     
-    # Save JSON
-    json_path = os.path.join(SAVE_DIR, "objects_info.json")
-    with open(json_path, 'w') as f:
-        json.dump(result, f, indent=2)
-    print(f"[OK] JSON: {json_path}")
+    # Save JSON (debug saja)
+    if save_debug:
+        json_path = os.path.join(SAVE_DIR, "objects_info.json")
+        with span("segment.write"), open(json_path, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"[OK] JSON: {json_path}")
     
+    result['segmented_image'] = segmented
+    result['bbox_image'] = vis
     return result
 
 
@@ -270,7 +606,7 @@ if __name__ == "__main__":
     image_path = r"E:\Skripsi\FastSAM\jalan_berlubang.jpg"
     
     # Dengan pre-processing
-    result = segment_objects(image_path, use_preprocess=True)
+    result = segment_objects(image_path, use_preprocess=True, save_debug=True)
     
     # Atau tanpa pre-processing
     # result = segment_objects(image_path, use_preprocess=False)
@@ -0,0 +1,149 @@
+# streaming.py
+# Mode streaming end-to-end: token Moondream -> kalimat -> cleaning -> Argos -> Piper -> audio.
+# Kalimat pertama sudah dibacakan selagi Moondream masih menghasilkan token berikutnya,
+# jadi metrik utama adalah time-to-first-audio (TTFA), bukan total waktu pipeline.
+
+import time
+import queue
+import threading
+from typing import Optional
+import numpy as np
+
+from test import (
+    MODEL_NAME,
+    FALLBACK_TTS,
+    stream_ollama_vision,
+    iter_sentences,
+    clean_sentence_for_tts,
+    navigation_suffix,
+)
+from translator_argos import translate_id
+from tts_piper import synthesize_id, play_pcm, write_wav
+
+_DONE = object()
+
+
+def _reader(tokens, sentence_q, marks, t_start, errors):
+    """Thread pembaca stream Ollama: taruh setiap kalimat utuh ke antrean."""
+    def timed_tokens():
+        for tok in tokens:
+            if "first_token" not in marks:
+                marks["first_token"] = time.perf_counter() - t_start
+            yield tok
+    try:
+        for sentence in iter_sentences(timed_tokens()):
+            if "first_sentence" not in marks:
+                marks["first_sentence"] = time.perf_counter() - t_start
+            sentence_q.put(sentence)
+    except Exception as e:
+        errors.append(e)
+    finally:
+        marks["vlm_done"] = time.perf_counter() - t_start
+        sentence_q.put(_DONE)
+
+
+def _player(audio_q, marks, t_start):
+    """Thread pemutar: putar klip PCM berurutan sesuai urutan kalimat."""
+    while True:
+        item = audio_q.get()
+        if item is _DONE:
+            break
+        pcm, sr = item
+        if "first_audio" not in marks:
+            marks["first_audio"] = time.perf_counter() - t_start
+        play_pcm(pcm, sr)
+
+
+def stream_describe_and_speak(
+    prompt: str,
+    image_b64: str,
+    model_name: str = MODEL_NAME,
+    t_start: Optional[float] = None,
+    output_wav_path: Optional[str] = None,
+    tokens=None,
+) -> dict:
+    """
+    Jalankan VLM -> cleaning -> terjemahan -> TTS per kalimat secara streaming.
+
+    Args:
+        prompt, image_b64: input Moondream
+        t_start: titik nol pengukuran (perf_counter); default saat fungsi dipanggil
+        output_wav_path: jika diisi, seluruh audio juga ditulis ke WAV
+        tokens: iterable token pengganti stream Ollama (untuk replay/benchmark)
+
+    Returns:
+        dict: en_text, id_text, pcm, sample_rate, error (None jika stream VLM sukses),
+              dan timing (detik sejak t_start):
+              first_token, first_sentence, first_audio (TTFA), vlm_done, total
+    """
+    t_start = time.perf_counter() if t_start is None else t_start
+    if tokens is None:
+        tokens = stream_ollama_vision(model_name, prompt, image_b64)
+
+    sentence_q = queue.Queue()
+    audio_q = queue.Queue()
+    marks, errors = {}, []
+
+    reader = threading.Thread(target=_reader, args=(tokens, sentence_q, marks, t_start, errors), daemon=True)
+    player = threading.Thread(target=_player, args=(audio_q, marks, t_start), daemon=True)
+    reader.start()
+    player.start()
+
+    en_parts, id_parts, pcm_parts = [], [], []
+    sample_rate = 0
+
+    def speak(en_sentence):
+        nonlocal sample_rate
+        id_sentence = translate_id(en_sentence)
+        pcm, sr = synthesize_id(id_sentence)
+        en_parts.append(en_sentence)
+        id_parts.append(id_sentence)
+        if pcm.size:
+            pcm_parts.append(pcm)
+            sample_rate = sr
+            audio_q.put((pcm, sr))
+
+    try:
+        while True:
+            sentence = sentence_q.get()
+            if sentence is _DONE:
+                break
+            en = clean_sentence_for_tts(sentence)
+            if not en:
+                continue
+            if en[-1] not in ".!?":
+                # Sisa kalimat terpotong num_predict: buang kalau sudah ada kalimat utuh
+                if en_parts:
+                    continue
+                en += "."
+            speak(en)
+
+        # Tutup dengan kalimat navigasi (atau fallback kalau jawaban terlalu pendek)
+        full_en = " ".join(en_parts)
+        if len(full_en) < 10 or len(full_en.split()) < 3:
+            closing = FALLBACK_TTS if not en_parts else navigation_suffix(full_en)
+        else:
+            closing = navigation_suffix(full_en)
+        if closing:
+            speak(closing)
+    finally:
+        audio_q.put(_DONE)
+        player.join()
+        reader.join(timeout=1.0)
+
+    if errors:
+        print(f"[Streaming] Warning: stream VLM error: {errors[0]}")
+
+    pcm_all = np.concatenate(pcm_parts) if pcm_parts else np.zeros(0, dtype=np.int16)
+    if output_wav_path and pcm_all.size:
+        write_wav(pcm_all, output_wav_path, sample_rate)
+
+    marks["total"] = time.perf_counter() - t_start
+    return {
+        "en_text": " ".join(en_parts),
+        "id_text": " ".join(id_parts),
+        "pcm": pcm_all,
+        "sample_rate": sample_rate,
+        "timing": marks,
+        "error": str(errors[0]) if errors else None,
+    }
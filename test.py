@@ -1,19 +1,30 @@
 import os
 import json
+import re
 import base64
-import requests
+import numpy as np
 from PIL import Image
+from vlm_client import get_client
+from image_payload import encode_payload
 
 # --- CONFIG ---
 pic_path = r"runs\fastsam_near\segmented.png"
 json_path = r"runs\fastsam_near\objects_info.json"
 MODEL_NAME = "moondream:latest"
-OLLAMA_URL = "http://localhost:11434/api/generate"
+NUM_PREDICT = 150  # batas token jawaban (bisa diturunkan oleh controller latency)
 output_dir = "Output"
 
 
-def encode_image_base64(image_path: str) -> str:
-    with open(image_path, "rb") as f:
+def encode_image_base64(image) -> str:
+    """
+    Base64 dari path gambar, bytes ter-encode (PNG/JPEG), atau ndarray BGR.
+    ndarray lewat image_payload.encode_payload (resize ke input Moondream + JPEG/WebP di memori).
+    """
+    if isinstance(image, np.ndarray):
+        return encode_payload(image)[0]
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return base64.b64encode(image).decode("utf-8")
+    with open(image, "rb") as f:
         return base64.b64encode(f.read()).decode("utf-8")
 
 def load_objects_info(json_path: str) -> dict:
@@ -59,30 +70,110 @@ Use natural language."""
         
     return prompt
 
-def query_ollama_vision(model_name: str, prompt_text: str, image_b64: str) -> str:
-    payload = {
+def _build_payload(model_name: str, prompt_text: str, image_b64, stream: bool, num_predict: int = None) -> dict:
+    # image_b64 boleh string base64, bytes ter-encode, atau ndarray BGR
+    if not isinstance(image_b64, str):
+        image_b64 = encode_image_base64(image_b64)
+    return {
         "model": model_name,
         "prompt": prompt_text,
         "images": [image_b64],
-        "stream": False,
+        "stream": stream,
         "options": {
             "temperature": 0.4,  # Sedikit lebih tinggi untuk variasi
-            "num_predict": 150,  # NAIKKAN ke 150 tokens
+            "num_predict": num_predict or NUM_PREDICT,
             "top_k": 20,
             "top_p": 0.92,
             "stop": ["Image", "In the image", "\n\n\n"]  # Stop sequences
         }
     }
+
+
+def query_ollama_vision(model_name: str, prompt_text: str, image_b64: str, num_predict: int = None) -> str:
+    payload = _build_payload(model_name, prompt_text, image_b64, stream=False, num_predict=num_predict)
     
     print(f"\nQuerying {model_name}...")
-    resp = requests.post(OLLAMA_URL, json=payload, timeout=120)
-    resp.raise_for_status()
-    data = resp.json()
+    data = get_client().generate(payload)
     
     answer_text = data.get("response", "")
     return answer_text.strip()
 
 
+def stream_ollama_vision(model_name: str, prompt_text: str, image_b64: str, num_predict: int = None):
+    """Generator token dari stream NDJSON Ollama (satu baris JSON per token)."""
+    payload = _build_payload(model_name, prompt_text, image_b64, stream=True, num_predict=num_predict)
+    
+    print(f"\nStreaming {model_name}...")
+    for data in get_client().generate_stream(payload):
+        token = data.get("response", "")
+        if token:
+            yield token
+
+
+# Batas kalimat: . ! ? diikuti spasi, tapi bukan penomoran "1." / "12."
+_SENTENCE_END = re.compile(r'(?<!\b\d)(?<!\b\d\d)[.!?]+(?=\s)|\n{2,}')
+
+
+def iter_sentences(tokens):
+    """
+    Potong aliran token jadi kalimat utuh segera setelah tanda akhir kalimat muncul.
+    Hanya sisa terakhir (kalau stream terpotong num_predict) yang bisa tanpa tanda baca.
+    """
+    buf = ""
+    for token in tokens:
+        buf += token
+        start = 0
+        for m in _SENTENCE_END.finditer(buf):
+            sentence = buf[start:m.end()].strip()
+            if sentence:
+                # Potongan paragraf tanpa tanda baca dianggap kalimat utuh
+                yield sentence if sentence[-1] in ".!?" else sentence + "."
+            start = m.end()
+        buf = buf[start:]
+    if buf.strip():
+        yield buf.strip()
+
+
+FALLBACK_TTS = "Obstacles detected ahead. Please proceed with caution."
+
+# Pola cleaning dikompilasi sekali (bukan setiap panggilan)
+_OBJECT_LABEL_START = re.compile(r'^Object\s+\d+:\s*', re.IGNORECASE)
+_OBJECT_LABEL_MID   = re.compile(r'\.\s+Object\s+\d+:\s*', re.IGNORECASE)
+_NUMBERING_START    = re.compile(r'^\d+\.\s*')
+_NUMBERING_MID      = re.compile(r'\.\s+\d+\.\s*')
+
+
+def navigation_suffix(txt: str) -> str:
+    """Kalimat navigasi yang ditambahkan jika teks belum berisi kata kunci navigasi."""
+    navigation_keywords = ["avoid", "careful", "stop", "climb", "move", "proceed", "use", "hold", "turn", "go", "keep", "distance", "safe"]
+    low = txt.lower()
+    if any(word in low for word in navigation_keywords):
+        return ""
+    
+    # Deteksi jenis objek untuk navigasi spesifik
+    if any(word in low for word in ["stair", "step"]):
+        return "Use handrail carefully."
+    elif any(word in low for word in ["hole", "pothole", "crack"]):
+        return "Avoid or stop."
+    elif any(word in low for word in ["vehicle", "motorcycle", "truck", "car"]):
+        return "Keep safe distance."
+    elif any(word in low for word in ["chair", "table", "obstacle", "object"]):
+        return "Avoid or move around."
+    return "Proceed with caution."
+
+
+def clean_sentence_for_tts(sentence: str) -> str:
+    """Cleaning satu kalimat (mode streaming): tanpa label objek/penomoran, spasi rapi."""
+    txt = " ".join(sentence.split())
+    txt = _NUMBERING_START.sub('', txt)
+    txt = _OBJECT_LABEL_START.sub('', txt)
+    if txt.startswith("xtremely"):
+        txt = "E" + txt
+    if not txt or not any(ch.isalpha() for ch in txt):
+        return ""
+    return txt[0].upper() + txt[1:]
+
+
 def clean_output_for_tts(answer: str) -> str:
     """Cleaning dan tambahkan navigasi"""
     txt = answer.replace("\n", " ").strip()
@@ -91,13 +182,12 @@ def clean_output_for_tts(answer: str) -> str:
     txt = txt.lstrip()
     
     # === HAPUS "Object 1:", "Object 2:", dll ===
-    import re
-    txt = re.sub(r'^Object\s+\d+:\s*', '', txt, flags=re.IGNORECASE)
-    txt = re.sub(r'\.\s+Object\s+\d+:\s*', '. ', txt, flags=re.IGNORECASE)
+    txt = _OBJECT_LABEL_START.sub('', txt)
+    txt = _OBJECT_LABEL_MID.sub('. ', txt)
     
     # === HAPUS numbering "1.", "2.", "3." di awal ===
-    txt = re.sub(r'^\d+\.\s*', '', txt)
-    txt = re.sub(r'\.\s+\d+\.\s*', '. ', txt)
+    txt = _NUMBERING_START.sub('', txt)
+    txt = _NUMBERING_MID.sub('. ', txt)
     
     # Fix huruf terpotong di awal
     if txt.startswith("xtremely"):
@@ -122,24 +212,12 @@ def clean_output_for_tts(answer: str) -> str:
     
     # Jika terlalu pendek
     if len(txt) < 10 or len(txt.split()) < 3:
-        return "Obstacles detected ahead. Please proceed with caution."
+        return FALLBACK_TTS
     
     # Tambahkan navigasi jika belum ada kata kunci navigasi
-    navigation_keywords = ["avoid", "careful", "stop", "climb", "move", "proceed", "use", "hold", "turn", "go", "keep", "distance", "safe"]
-    has_navigation = any(word in txt.lower() for word in navigation_keywords)
-    
-    if not has_navigation:
-        # Deteksi jenis objek untuk navigasi spesifik
-        if any(word in txt.lower() for word in ["stair", "step"]):
-            txt += " Use handrail carefully."
-        elif any(word in txt.lower() for word in ["hole", "pothole", "crack"]):
-            txt += " Avoid or stop."
-        elif any(word in txt.lower() for word in ["vehicle", "motorcycle", "truck", "car"]):
-            txt += " Keep safe distance."
-        elif any(word in txt.lower() for word in ["chair", "table", "obstacle", "object"]):
-            txt += " Avoid or move around."
-        else:
-            txt += " Proceed with caution."
+    suffix = navigation_suffix(txt)
+    if suffix:
+        txt += " " + suffix
     
     # Pastikan ada titik di akhir
     if not txt.endswith("."):
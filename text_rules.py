@@ -0,0 +1,93 @@
+# text_rules.py
+# Mesin rewrite teks berbasis tabel: semua aturan (src -> dst) dikompilasi sekali jadi satu
+# regex alternation, lalu teks dipindai satu kali (single pass). Menambah aturan tidak
+# menambah jumlah pemindaian teks, jadi tabel bisa tumbuh sampai ratusan entri.
+#
+# Prioritas: di posisi yang sama, aturan yang lebih dulu di tabel menang. Karena itu frasa
+# panjang ditulis sebelum frasa pendek yang menjadi awalannya ("is located ahead of the
+# intersection" sebelum "is located ahead"). Hasil rewrite tidak dipindai ulang; kalau
+# butuh aturan bertingkat, pakai beberapa RewriteRules berurutan (lihat ID_SPLIT_RULES).
+
+import re
+
+SPACES = re.compile(r' {2,}')
+
+
+class RewriteRules:
+    """Kumpulan aturan literal (src, dst) yang dikompilasi jadi satu matcher single-pass."""
+
+    def __init__(self, rules, name: str = ""):
+        self.name = name
+        self.table = {}
+        for src, dst in rules:
+            # Duplikat: entri pertama yang berlaku (sesuai prioritas urutan tabel)
+            self.table.setdefault(src, dst)
+        pattern = "|".join(re.escape(src) for src in self.table)
+        self.pattern = re.compile(pattern) if pattern else None
+
+    def apply(self, text: str) -> str:
+        if self.pattern is None:
+            return text
+        table = self.table
+        return self.pattern.sub(lambda m: table[m.group(0)], text)
+
+    def __len__(self):
+        return len(self.table)
+
+
+def collapse_spaces(text: str) -> str:
+    return SPACES.sub(" ", text)
+
+
+# ===== TABEL ATURAN =====
+# Bahasa Inggris sebelum Argos (case-sensitive, seperti keluaran Moondream)
+EN_NORMALIZE_RULES = [
+    ("in the foreground", "in front of you"),
+    ("is located ahead of the intersection", "is ahead at the intersection"),
+    ("is located ahead", "is ahead"),
+    ("is parked at the curb", "is parked on the right side"),
+    ("indicating that it's safe for pedestrians to cross",
+     "the light says it is safe to cross"),
+]
+
+# Bahasa Indonesia hasil Argos (teks sudah di-lowercase)
+ID_POLISH_RULES = [
+    # Pola umum
+    ("jalan kota dengan pejalan kaki menyeberang di depan anda", "di depan ada area penyeberangan dengan garis putih"),
+    ("jalan kota dengan pejalan kaki menyeberang di depan kamu", "di depan ada area penyeberangan dengan garis putih"),
+    ("jalan kota dengan penyeberangan pejalan kaki di depan anda", "di depan ada area penyeberangan dengan garis putih"),
+    ("jalan kota dengan penyeberangan pejalan kaki di depan kamu", "di depan ada area penyeberangan dengan garis putih"),
+
+    # Hilangkan pengulangan frasa
+    # ("garis putih, menampilkan garis putih" tidak ada di sini: di loop lama aturan itu tidak
+    # pernah cocok karena "menampilkan garis putih" sudah diganti lebih dulu)
+    ("menampilkan garis putih dan tanda penyeberangan", "serta tanda penyeberangan"),
+    ("menampilkan garis putih", "dengan garis putih"),
+    ("mobil diparkir di sisi kanan di sisi kanan", "mobil diparkir di sisi kanan"),
+    ("lampu merah di depan persimpangan, lampu merah menunjukkan aman untuk menyeberang",
+     "lampu merah di depan persimpangan menunjukkan aman untuk menyeberang"),
+
+    # Umumkan bentuk kalimat agar natural
+    ("terletak di", "ada di"),
+    ("sementara di sisi kiri", "di sisi kiri"),
+    ("sementara di sisi kanan", "di sisi kanan"),
+    ("sementara di sebelah kiri", "di sisi kiri"),
+    ("sementara di sebelah kanan", "di sisi kanan"),
+    ("lampu lalu lintas", "lampu merah"),
+    ("lampu mengatakan aman", "lampu merah menunjukkan aman"),
+    ("lampu menyatakan aman", "lampu merah menunjukkan aman"),
+    ("menunjukkan bahwa aman", "menunjukkan aman"),
+    ("tanda \"wideway\"", "tanda penyeberangan"),
+    ("tanda “wideway”", "tanda penyeberangan"),
+    ("wideway", "penyeberangan"),
+]
+
+# Pass kedua: pisahkan kalimat (koma -> titik) setelah frasa dirapikan
+ID_SPLIT_RULES = [
+    (", di sisi", ". Di sisi"),
+    (", lampu merah", ". Lampu merah"),
+]
+
+EN_NORMALIZE = RewriteRules(EN_NORMALIZE_RULES, "en_normalize")
+ID_POLISH = RewriteRules(ID_POLISH_RULES, "id_polish")
+ID_SPLIT = RewriteRules(ID_SPLIT_RULES, "id_split")
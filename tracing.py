@@ -0,0 +1,252 @@
+# tracing.py
+# Tracer span bertingkat berbasis perf_counter_ns (monotonic). Span yang selesai disimpan di
+# ring buffer untuk agregasi p50/p95/p99, lalu diekspor sebagai JSONL (satu span per baris)
+# dan snapshot teks gaya Prometheus. Menggantikan dict latency + file _latency.txt per frame.
+#
+#   with span("segment.predict"):          # parent otomatis = span aktif di thread ini
+#       ...
+#   root = get_tracer().start_span("pipeline", start_ns=...)   # span lintas thread
+#   with span("stage.vlm", parent=root): ...
+#   root.end()
+
+import os
+import json
+import time
+import itertools
+import threading
+from collections import deque, defaultdict
+
+# ====== KONFIG ======
+RING_SIZE    = 20000                      # jumlah span terakhir untuk persentil
+PENDING_SIZE = 20000                      # span belum diekspor ke JSONL (lebih lama dibuang)
+TRACE_PATH   = os.path.join("Output", "trace.jsonl")
+METRICS_PATH = os.path.join("Output", "metrics.prom")
+QUANTILES    = (50, 95, 99)
+
+
+def _percentile(xs, q: float) -> float:
+    """Persentil (0-100) dengan interpolasi linear; xs sudah terurut."""
+    if not xs:
+        return 0.0
+    k = (len(xs) - 1) * q / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+
+class Span:
+    """Satu span: nama, waktu mulai/selesai (ns), parent, dan atribut bebas."""
+
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attrs")
+
+    def __init__(self, tracer, name, trace_id, span_id, parent_id, start_ns, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start_ns = start_ns
+        self.end_ns = None
+        self.attrs = attrs
+
+    @property
+    def duration_ns(self) -> int:
+        end = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return end - self.start_ns
+
+    @property
+    def duration_s(self) -> float:
+        return self.duration_ns / 1e9
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def end(self, end_ns: int = None):
+        if self.end_ns is None:
+            self.end_ns = end_ns if end_ns is not None else time.perf_counter_ns()
+            self.tracer._finish(self)
+        return self
+
+    def as_dict(self) -> dict:
+        d = {
+            "trace": self.trace_id,
+            "span": self.span_id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "dur_ms": round(self.duration_ns / 1e6, 3),
+        }
+        if self.attrs:
+            d["attrs"] = self.attrs
+        return d
+
+
+class _SpanContext:
+    """Context manager: span aktif di thread ini selama blok berjalan."""
+
+    def __init__(self, tracer, name, parent, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.span = None
+
+    def __enter__(self) -> Span:
+        self.span = self.tracer.start_span(self.name, parent=self.parent, **self.attrs)
+        self.tracer._stack().append(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        stack = self.tracer._stack()
+        if stack and stack[-1] is self.span:
+            stack.pop()
+        if exc_type is not None:
+            self.span.attrs["error"] = exc_type.__name__
+        self.span.end()
+        return False
+
+
+class Tracer:
+    """
+    Tracer proses: ring buffer span selesai + counter kumulatif per nama span.
+
+    Span bersarang memakai stack thread-local; span yang pindah thread (satu trigger
+    melewati beberapa worker executor) diberi parent secara eksplisit.
+    """
+
+    def __init__(self, ring_size: int = RING_SIZE, pending_size: int = PENDING_SIZE):
+        self.ring = deque(maxlen=ring_size)
+        self._pending = deque(maxlen=pending_size)   # span yang belum diekspor ke JSONL
+        self.pending_dropped = 0                     # span dibuang karena tidak pernah di-flush
+        self._count = defaultdict(int)
+        self._sum_ns = defaultdict(int)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self):
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def start_span(self, name: str, parent: Span = None, start_ns: int = None, **attrs) -> Span:
+        """Mulai span manual (harus di-end()). parent default = span aktif di thread ini."""
+        parent = parent if parent is not None else self.current()
+        span_id = next(self._ids)
+        trace_id = parent.trace_id if parent is not None else span_id
+        return Span(self, name, trace_id, span_id, parent.span_id if parent is not None else None,
+                    start_ns if start_ns is not None else time.perf_counter_ns(), attrs)
+
+    def span(self, name: str, parent: Span = None, **attrs) -> _SpanContext:
+        return _SpanContext(self, name, parent, attrs)
+
+    def record(self, name: str, duration_s: float, parent: Span = None, **attrs) -> Span:
+        """Catat durasi yang diukur di tempat lain (mis. TTFA) sebagai span yang sudah selesai."""
+        parent = parent if parent is not None else self.current()
+        start_ns = parent.start_ns if parent is not None else time.perf_counter_ns()
+        sp = self.start_span(name, parent=parent, start_ns=start_ns, **attrs)
+        return sp.end(start_ns + int(duration_s * 1e9))
+
+    def _finish(self, span: Span):
+        with self._lock:
+            self.ring.append(span)
+            if len(self._pending) == self._pending.maxlen:
+                self.pending_dropped += 1
+            self._pending.append(span)
+            self._count[span.name] += 1
+            self._sum_ns[span.name] += span.duration_ns
+
+    def reset(self):
+        """Kosongkan ring buffer dan counter (mis. setelah frame warm-up benchmark)."""
+        with self._lock:
+            self.ring.clear()
+            self._pending.clear()
+            self.pending_dropped = 0
+            self._count.clear()
+            self._sum_ns.clear()
+
+    # ===== AGREGASI =====
+    def trace_spans(self, trace_id: int) -> list:
+        with self._lock:
+            return [s for s in self.ring if s.trace_id == trace_id]
+
+    def aggregate(self) -> dict:
+        """Per nama span (isi ring buffer): n, mean, p50/p95/p99, max (ms)."""
+        with self._lock:
+            by_name = defaultdict(list)
+            for s in self.ring:
+                by_name[s.name].append(s.duration_ns / 1e6)
+        out = {}
+        for name, xs in sorted(by_name.items()):
+            xs.sort()
+            row = {"n": len(xs), "mean_ms": round(sum(xs) / len(xs), 3)}
+            for q in QUANTILES:
+                row[f"p{q}_ms"] = round(_percentile(xs, q), 3)
+            row["max_ms"] = round(xs[-1], 3)
+            out[name] = row
+        return out
+
+    # ===== EKSPOR =====
+    def flush_jsonl(self, path: str = TRACE_PATH) -> int:
+        """Tambahkan span yang belum diekspor ke file JSONL. Return jumlah span ditulis."""
+        with self._lock:
+            pending = list(self._pending)
+            self._pending.clear()
+        if not pending:
+            return 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for s in pending:
+                f.write(json.dumps(s.as_dict(), ensure_ascii=False) + "\n")
+        return len(pending)
+
+    def prometheus_text(self, prefix: str = "vision_assist") -> str:
+        """Snapshot gaya Prometheus: summary per span (kuantil dari ring, sum/count kumulatif)."""
+        agg = self.aggregate()
+        with self._lock:
+            counts, sums = dict(self._count), dict(self._sum_ns)
+        metric = f"{prefix}_span_seconds"
+        lines = [f"# HELP {metric} Durasi span pipeline (detik).", f"# TYPE {metric} summary"]
+        for name in sorted(counts):
+            row = agg.get(name)
+            if row is not None:
+                for q in QUANTILES:
+                    lines.append(f'{metric}{{span="{name}",quantile="{q / 100:g}"}} {row[f"p{q}_ms"] / 1000:.6f}')
+            lines.append(f'{metric}_sum{{span="{name}"}} {sums[name] / 1e9:.6f}')
+            lines.append(f'{metric}_count{{span="{name}"}} {counts[name]}')
+        lines += [f"# HELP {prefix}_trace_dropped_spans Span yang dibuang sebelum diekspor ke JSONL.",
+                  f"# TYPE {prefix}_trace_dropped_spans counter",
+                  f"{prefix}_trace_dropped_spans {self.pending_dropped}"]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str = METRICS_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+    def print_summary(self, names=None):
+        for name, r in self.aggregate().items():
+            if names is not None and name not in names:
+                continue
+            print(f"[Trace] {name:28s}: n {r['n']:5d} | p50 {r['p50_ms']:9.1f} ms | "
+                  f"p95 {r['p95_ms']:9.1f} ms | p99 {r['p99_ms']:9.1f} ms")
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def span(name: str, parent: Span = None, **attrs) -> _SpanContext:
+    """Shortcut: get_tracer().span(...)."""
+    return _tracer.span(name, parent=parent, **attrs)
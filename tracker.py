@@ -0,0 +1,140 @@
+# tracker.py
+# Tracker objek ringan untuk mode continuous: objek hasil segment_objects dicocokkan antar
+# frame lewat IoU bbox + posisi (analyze_position). Event hanya muncul kalau objek baru masuk
+# band "near" atau objek yang sudah dilacak pindah band, sehingga Moondream + TTS dipanggil
+# per kejadian, bukan per frame.
+
+from dataclasses import dataclass, field
+from typing import Optional
+import numpy as np
+
+from segmentation import box_iou_matrix
+
+# ====== KONFIG ======
+IOU_MATCH   = 0.3    # IoU minimum untuk dianggap objek yang sama
+CENTER_DIST = 0.12   # atau: h_position sama dan jarak pusat < 12% diagonal frame
+MIN_HITS    = 2      # frame berturut-turut sebelum track / band baru dianggap stabil
+MAX_MISSES  = 3      # frame tanpa match sebelum track dihapus
+
+
+@dataclass
+class Track:
+    id: int
+    bbox: list
+    h_position: str
+    v_position: str           # band stabil terakhir
+    hits: int = 1
+    misses: int = 0
+    confirmed: bool = False
+    pending_band: Optional[str] = None
+    pending_count: int = 0
+    obj: dict = field(default_factory=dict)
+
+
+@dataclass
+class TrackEvent:
+    kind: str                 # "enter_near" | "band_change"
+    track: Track
+    prev_band: Optional[str] = None
+
+    def describe(self) -> str:
+        t = self.track
+        if self.kind == "enter_near":
+            return f"track #{t.id} masuk near ({t.h_position})"
+        return f"track #{t.id} {self.prev_band} -> {t.v_position} ({t.h_position})"
+
+
+def _center(b):
+    return (b[0] + b[2]) / 2.0, (b[1] + b[3]) / 2.0
+
+
+class ObjectTracker:
+    """
+    Pencocokan greedy track <-> deteksi per frame.
+
+    Pasangan valid jika IoU >= iou_match, atau h_position sama dan jarak pusat
+    < center_dist * diagonal frame. Pasangan diurutkan dari IoU terbesar (lalu jarak terdekat).
+    """
+
+    def __init__(self, iou_match: float = IOU_MATCH, center_dist: float = CENTER_DIST,
+                 min_hits: int = MIN_HITS, max_misses: int = MAX_MISSES):
+        self.iou_match = iou_match
+        self.center_dist = center_dist
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self.tracks = []
+        self._next_id = 1
+
+    def _match(self, objects: list, W: int, H: int):
+        if not self.tracks or not objects:
+            return []
+        T = len(self.tracks)
+        boxes = [t.bbox for t in self.tracks] + [o["bbox"] for o in objects]
+        ious = box_iou_matrix(boxes)[:T, T:]
+        diag = float(np.hypot(W, H)) or 1.0
+        pairs = []
+        for i, t in enumerate(self.tracks):
+            cx, cy = _center(t.bbox)
+            for j, o in enumerate(objects):
+                ox, oy = _center(o["bbox"])
+                dist = float(np.hypot(cx - ox, cy - oy)) / diag
+                if ious[i, j] >= self.iou_match or (t.h_position == o["h_position"] and dist < self.center_dist):
+                    pairs.append((-ious[i, j], dist, i, j))
+        pairs.sort()
+        used_t, used_d, matches = set(), set(), []
+        for _, _, i, j in pairs:
+            if i in used_t or j in used_d:
+                continue
+            used_t.add(i)
+            used_d.add(j)
+            matches.append((i, j))
+        return matches
+
+    def update(self, objects: list, W: int, H: int) -> list:
+        """Perbarui track dengan objek frame ini. Return daftar TrackEvent."""
+        events = []
+        matches = self._match(objects, W, H)
+        matched_t = {i for i, _ in matches}
+        matched_d = {j for _, j in matches}
+
+        for i, j in matches:
+            t, o = self.tracks[i], objects[j]
+            t.bbox, t.h_position, t.obj = o["bbox"], o["h_position"], o
+            t.hits += 1
+            t.misses = 0
+            band = o["v_position"]
+            if not t.confirmed:
+                t.v_position = band
+                if t.hits >= self.min_hits:
+                    t.confirmed = True
+                    if band == "near":
+                        events.append(TrackEvent("enter_near", t))
+                continue
+            # Band baru harus bertahan min_hits frame (hindari kedip di batas band)
+            if band == t.v_position:
+                t.pending_band, t.pending_count = None, 0
+            elif band == t.pending_band:
+                t.pending_count += 1
+            else:
+                t.pending_band, t.pending_count = band, 1
+            if t.pending_band is not None and t.pending_count >= self.min_hits:
+                prev, t.v_position = t.v_position, t.pending_band
+                t.pending_band, t.pending_count = None, 0
+                events.append(TrackEvent("band_change", t, prev))
+
+        for i, t in enumerate(self.tracks):
+            if i not in matched_t:
+                t.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+
+        for j, o in enumerate(objects):
+            if j in matched_d:
+                continue
+            t = Track(self._next_id, o["bbox"], o["h_position"], o["v_position"], obj=o)
+            self._next_id += 1
+            if self.min_hits <= 1:
+                t.confirmed = True
+                if t.v_position == "near":
+                    events.append(TrackEvent("enter_near", t))
+            self.tracks.append(t)
+        return events
@@ -2,28 +2,123 @@
 # Pipeline Moondream EN -> Bahasa Indonesia lisan -> siap dibacakan Piper TTS
 
 import os
-_argos_ready = False
+import re
+import time
+import threading
+from cache_store import LRUCache, SqliteKV
+from text_rules import EN_NORMALIZE, ID_POLISH, ID_SPLIT, collapse_spaces
 
 ARGOS_MODEL_PATH = r"models\translate-en_id-1_9.argosmodel"
 
+# Cache terjemahan per kalimat (memori + SQLite); None -> tanpa cache disk
+TRANSLATION_CACHE      = True               # False -> setiap kalimat langsung ke Argos
+TRANSLATION_CACHE_SIZE = 2048
+TRANSLATION_CACHE_DB   = os.path.join("runs", "cache", "translation_cache.sqlite")
+TRANSLATION_DB_MAX_ROWS = 20000             # baris SQLite maksimum (terlama dibuang)
+TRANSLATION_DB_MAX_AGE  = 30 * 24 * 3600    # detik
 
-def _ensure_argos_loaded():
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+_translation_lru = LRUCache(maxsize=TRANSLATION_CACHE_SIZE)
+_translation_db = None
+_translation_db_lock = threading.Lock()
+_translation_stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+
+class ArgosTranslator:
     """
-    Pastikan model Argos en->id ter-install sekali di runtime.
+    Translator Argos en->id yang dimuat sekali per proses.
+
+    - Paket .argosmodel hanya di-install kalau belum ada di get_installed_packages()
+      (install_from_path meng-unzip paket, jadi tidak diulang setiap start).
+    - Objek terjemahan en->id di-resolve sekali dan disimpan; translate() memanggilnya
+      langsung tanpa lookup bahasa lagi.
+    - Waktu load (cek paket, install, resolve) dicatat terpisah dari waktu translate.
+    - Dengan budget thread (resources.py), ctranslate2.Translator dibuat sendiri dengan
+      inter_threads/intra_threads eksplisit: argostranslate 1.9.x membuatnya tanpa
+      parameter thread (setting/env thread Argos diabaikan).
     """
-    global _argos_ready
-    if _argos_ready:
-        return
-    try:
+
+    def __init__(self, model_path: str = ARGOS_MODEL_PATH, from_code: str = "en", to_code: str = "id"):
+        self.model_path = model_path
+        self.from_code = from_code
+        self.to_code = to_code
+        self.translation = None
+        self.installed_now = False
+        self.load_times = {}
+        self.calls = 0
+        self.translate_total = 0.0
+
+    def _is_installed(self) -> bool:
         import argostranslate.package
-        if os.path.exists(ARGOS_MODEL_PATH):
-            argostranslate.package.install_from_path(ARGOS_MODEL_PATH)
-        else:
-            print(f"[ArgosTranslate] Warning: model file not found at {ARGOS_MODEL_PATH}")
-        _argos_ready = True
-    except Exception as e:
-        print(f"[ArgosTranslate] Warning: failed to load Argos model: {e}")
-        _argos_ready = False
+        return any(p.from_code == self.from_code and p.to_code == self.to_code
+                   for p in argostranslate.package.get_installed_packages())
+
+    def load(self) -> "ArgosTranslator":
+        t0 = time.perf_counter()
+        if not self._is_installed():
+            import argostranslate.package
+            if not os.path.exists(self.model_path):
+                raise FileNotFoundError(f"Model Argos tidak ditemukan: {self.model_path}")
+            print(f"[ArgosTranslate] Install paket {self.model_path} (sekali saja)")
+            argostranslate.package.install_from_path(self.model_path)
+            self.installed_now = True
+        t1 = time.perf_counter()
+
+        from argostranslate import translate as argos_translate
+        langs = argos_translate.get_installed_languages()
+        src = next((l for l in langs if l.code == self.from_code), None)
+        dst = next((l for l in langs if l.code == self.to_code), None)
+        if src is None or dst is None:
+            raise RuntimeError(f"Paket Argos {self.from_code}->{self.to_code} belum ter-install")
+        self.translation = src.get_translation(dst)
+        from resources import engine_threads
+        if engine_threads("argos"):
+            self.set_threads(engine_threads("argos"))
+        t2 = time.perf_counter()
+
+        self.load_times = {"install": t1 - t0, "resolve": t2 - t1, "total": t2 - t0}
+        print(f"[ArgosTranslate] Siap: load {self.load_times['total']:.3f}s "
+              f"(cek/install {self.load_times['install']:.3f}s, resolve {self.load_times['resolve']:.3f}s)")
+        return self
+
+    def set_threads(self, intra_threads: int):
+        """Bangun ulang ctranslate2.Translator paket en->id dengan jumlah thread eksplisit."""
+        pkg_translation = self.translation
+        while hasattr(pkg_translation, "underlying"):   # CachedTranslation -> PackageTranslation
+            pkg_translation = pkg_translation.underlying
+        if not (hasattr(pkg_translation, "pkg") and hasattr(pkg_translation, "translator")):
+            print(f"[ArgosTranslate] Warning: thread tidak diatur ({type(pkg_translation).__name__})")
+            return
+        import ctranslate2
+        from argostranslate import settings as argos_settings
+        pkg_translation.translator = ctranslate2.Translator(
+            str(pkg_translation.pkg.package_path / "model"), device=argos_settings.device,
+            inter_threads=1, intra_threads=intra_threads)
+        print(f"[ArgosTranslate] CTranslate2 intra-op threads: {intra_threads}")
+
+    def translate(self, text_en: str) -> str:
+        if self.translation is None:
+            self.load()
+        t0 = time.perf_counter()
+        out = self.translation.translate(text_en)
+        self.translate_total += time.perf_counter() - t0
+        self.calls += 1
+        return out
+
+    def stats(self) -> dict:
+        return {
+            "load_s": round(self.load_times.get("total", 0.0), 3),
+            "installed_now": self.installed_now,
+            "calls": self.calls,
+            "translate_avg_ms": round(self.translate_total / self.calls * 1000, 1) if self.calls else 0.0,
+        }
+
+
+def load_argos_translation() -> ArgosTranslator:
+    """
+    Translator en->id yang sudah dimuat (dipakai oleh model pool).
+    """
+    return ArgosTranslator().load()
 
 
 def normalize_en_for_translate(text_en: str) -> str:
@@ -33,38 +128,93 @@ def normalize_en_for_translate(text_en: str) -> str:
     - langsung sebut lokasi (left/right/ahead)
     - hindari frasa panjang seperti 'in the foreground'
     """
-    t = text_en.strip()
-
-    replacements = [
-        ("in the foreground", "in front of you"),
-        ("in the foreground,", "in front of you,"),
-        ("in the foreground.", "in front of you."),
-        ("is located ahead of the intersection", "is ahead at the intersection"),
-        ("is located ahead", "is ahead"),
-        ("is parked at the curb", "is parked on the right side"),
-        ("indicating that it's safe for pedestrians to cross",
-         "the light says it is safe to cross"),
-    ]
-
-    for src, dst in replacements:
-        t = t.replace(src, dst)
+    return EN_NORMALIZE.apply(text_en.strip())
 
-    return t
+
+def _argos_translate_raw(text_en: str) -> str:
+    """Terjemahan Argos tanpa fallback (error diteruskan)."""
+    from model_pool import get_pool
+    translation = get_pool().get("argos")
+    return translation.translate(text_en).strip()
+
+
+def _get_translation_db():
+    """SqliteKV cache terjemahan (dibuka sekali; dipanggil dari thread stage dan stream)."""
+    global _translation_db
+    with _translation_db_lock:
+        if _translation_db is None and TRANSLATION_CACHE_DB:
+            try:
+                _translation_db = SqliteKV(TRANSLATION_CACHE_DB, "translations",
+                                           max_rows=TRANSLATION_DB_MAX_ROWS, max_age=TRANSLATION_DB_MAX_AGE)
+            except Exception as e:
+                print(f"[ArgosTranslate] Warning: cache disk tidak bisa dibuka: {e}")
+        return _translation_db
 
 
-def _argos_translate_en_id(text_en_simple: str) -> str:
+def split_sentences(text: str) -> list:
+    return [s for s in _SENTENCE_SPLIT.split(text.strip()) if s]
+
+
+def translate_sentences_cached(text_en_simple: str) -> str:
     """
-    Terjemahkan Inggris -> Indonesia via Argos.
-    Kalau Argos error, fallback ke teks Inggris biar gak crash.
+    Terjemahkan per kalimat lewat cache: LRU memori -> SQLite -> Argos (hanya untuk miss).
+    Hasil fallback (Argos error) tidak disimpan ke cache.
     """
-    _ensure_argos_loaded()
-    try:
-        from argostranslate import translate as argos_translate
-        text_id = argos_translate.translate(text_en_simple, "en", "id")
-        return text_id.strip()
-    except Exception as e:
-        print(f"[ArgosTranslate] Warning: translation failed: {e}")
-        return text_en_simple.strip()
+    out = []
+    cache = TRANSLATION_CACHE
+    db = _get_translation_db() if cache else None
+    for sentence in split_sentences(text_en_simple):
+        key = " ".join(sentence.split())
+        text_id = _translation_lru.get(key) if cache else None
+        if text_id is not None:
+            _translation_stats["hits"] += 1
+        elif db is not None and (text_id := db.get(key)) is not None:
+            _translation_stats["hits"] += 1
+            _translation_stats["disk_hits"] += 1
+            _translation_lru.put(key, text_id)
+        else:
+            _translation_stats["misses"] += 1
+            try:
+                text_id = _argos_translate_raw(key)
+                if cache:
+                    _translation_lru.put(key, text_id)
+                if db is not None:
+                    db.put(key, text_id)
+            except Exception as e:
+                print(f"[ArgosTranslate] Warning: translation failed: {e}")
+                text_id = key
+        out.append(text_id)
+    return " ".join(out)
+
+
+def reset_translation_cache(enabled: bool = True, db_path: str = None):
+    """
+    Mulai dari cache terjemahan kosong (LRU + counter). db_path None -> tanpa store disk.
+    Dipakai bench replay supaya hasil tidak bergantung pada isi cache dari run sebelumnya.
+    """
+    global TRANSLATION_CACHE, TRANSLATION_CACHE_DB, _translation_lru, _translation_db
+    with _translation_db_lock:
+        if _translation_db is not None:
+            _translation_db.close()
+        TRANSLATION_CACHE = enabled
+        TRANSLATION_CACHE_DB = db_path
+        _translation_lru = LRUCache(maxsize=TRANSLATION_CACHE_SIZE)
+        _translation_db = None
+        _translation_stats.update(hits=0, disk_hits=0, misses=0)
+
+
+def translation_cache_stats() -> dict:
+    """Counter hit/miss cache terjemahan (hits termasuk disk_hits)."""
+    total = _translation_stats["hits"] + _translation_stats["misses"]
+    return dict(_translation_stats, entries=len(_translation_lru),
+                hit_rate=round(_translation_stats["hits"] / total, 3) if total else 0.0)
+
+
+def argos_stats() -> dict:
+    """Waktu load vs translate dari translator resident (kosong jika belum dimuat)."""
+    from model_pool import get_pool
+    pool = get_pool()
+    return pool.get("argos").stats() if pool.is_loaded("argos") else {}
 
 
 def _polish_indonesian_for_tts(text_id: str) -> str:
@@ -72,49 +222,13 @@ def _polish_indonesian_for_tts(text_id: str) -> str:
     Rapikan hasil Argos supaya lebih natural dan tidak berulang.
     Fokus agar kalimat ringkas, mudah diucapkan, dan sesuai konteks navigasi.
     """
-    t = text_id.strip().lower()
-
-    replacements = [
-        # Pola umum
-        ("jalan kota dengan pejalan kaki menyeberang di depan anda", "di depan ada area penyeberangan dengan garis putih"),
-        ("jalan kota dengan pejalan kaki menyeberang di depan kamu", "di depan ada area penyeberangan dengan garis putih"),
-        ("jalan kota dengan penyeberangan pejalan kaki di depan anda", "di depan ada area penyeberangan dengan garis putih"),
-        ("jalan kota dengan penyeberangan pejalan kaki di depan kamu", "di depan ada area penyeberangan dengan garis putih"),
-
-        # Hilangkan pengulangan frasa
-        ("menampilkan garis putih dan tanda penyeberangan", "serta tanda penyeberangan"),
-        ("menampilkan garis putih", "dengan garis putih"),
-        ("garis putih, menampilkan garis putih", "garis putih"),
-        ("mobil diparkir di sisi kanan di sisi kanan", "mobil diparkir di sisi kanan"),
-        ("lampu merah di depan persimpangan, lampu merah menunjukkan aman untuk menyeberang",
-         "lampu merah di depan persimpangan menunjukkan aman untuk menyeberang"),
-
-        # Umumkan bentuk kalimat agar natural
-        ("terletak di", "ada di"),
-        ("sementara di sisi kiri", "di sisi kiri"),
-        ("sementara di sisi kanan", "di sisi kanan"),
-        ("sementara di sebelah kiri", "di sisi kiri"),
-        ("sementara di sebelah kanan", "di sisi kanan"),
-        ("lampu lalu lintas", "lampu merah"),
-        ("lampu mengatakan aman", "lampu merah menunjukkan aman"),
-        ("lampu menyatakan aman", "lampu merah menunjukkan aman"),
-        ("menunjukkan bahwa aman", "menunjukkan aman"),
-        ("tanda \"wideway\"", "tanda penyeberangan"),
-        ("tanda “wideway”", "tanda penyeberangan"),
-        ("wideway", "penyeberangan"),
-    ]
-
-    for src, dst in replacements:
-        if src in t:
-            t = t.replace(src, dst)
+    t = ID_POLISH.apply(text_id.strip().lower())
 
     # Pisahkan kalimat jadi rapi: koma -> titik di tempat tertentu
-    t = t.replace(", di sisi", ". Di sisi")
-    t = t.replace(", lampu merah", ". Lampu merah")
+    t = ID_SPLIT.apply(t)
 
     # Rapikan spasi
-    while "  " in t:
-        t = t.replace("  ", " ")
+    t = collapse_spaces(t)
 
     # Kapitalisasi awal dan tanda titik
     t = t.strip()
@@ -131,12 +245,12 @@ def describe_scene_for_tts(text_en: str) -> str:
     """
     Fungsi utama yang dipakai pipeline kamu:
     1. bersihin English
-    2. translate offline Argos
+    2. translate offline Argos per kalimat (kalimat yang sudah pernah diterjemahkan diambil dari cache)
     3. poles biar natural untuk dibacakan
     Output: Bahasa Indonesia final (pendek, jelas, navigasi)
     """
     en_simple = normalize_en_for_translate(text_en)
-    id_raw = _argos_translate_en_id(en_simple)
+    id_raw = translate_sentences_cached(en_simple)
     id_clean = _polish_indonesian_for_tts(id_raw)
     return id_clean
 
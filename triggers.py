@@ -0,0 +1,206 @@
+# triggers.py
+# Sumber trigger yang bisa diganti-ganti: tombol Jetson GPIO, keyboard, UNIX socket, atau replay.
+# Semua sumber memanggil TriggerHub.fire(); loop utama blocking di hub.wait() dan langsung
+# bangun saat trigger datang (tanpa polling), sehingga latency trigger->mulai bisa diukur.
+
+import os
+import sys
+import time
+import queue
+import socket
+import threading
+from dataclasses import dataclass
+
+# ====== KONFIG ======
+BUTTON_PIN = 37
+DEBOUNCE_SEC = 0.15
+SOCKET_PATH = "/tmp/vision_assist.sock"
+INPUT_BACKENDS = ("gpio", "keyboard", "socket", "replay")
+
+
+@dataclass
+class TriggerEvent:
+    source: str
+    t: float          # time.perf_counter() saat trigger terjadi
+    seq: int
+
+
+class TriggerHub:
+    """Antrean trigger dengan debounce; `wait()` blocking sampai trigger berikutnya."""
+
+    def __init__(self, debounce_sec: float = DEBOUNCE_SEC):
+        self.debounce_sec = debounce_sec
+        self._q = queue.Queue()
+        self._lock = threading.Lock()
+        self._last = 0.0
+        self._seq = 0
+
+    def fire(self, source: str) -> bool:
+        """Dipanggil sumber trigger (boleh dari thread/callback mana pun)."""
+        now = time.perf_counter()
+        with self._lock:
+            if now - self._last < self.debounce_sec:
+                return False
+            self._last = now
+            self._seq += 1
+            self._q.put(TriggerEvent(source, now, self._seq))
+        return True
+
+    def close(self):
+        """Bangunkan wait() dengan None (untuk keluar dari loop utama)."""
+        self._q.put(None)
+
+    def wait(self, timeout: float = None):
+        """Tunggu trigger berikutnya. Return TriggerEvent, atau None jika hub ditutup/timeout."""
+        try:
+            return self._q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class TriggerSource:
+    name = "base"
+
+    def start(self, hub: TriggerHub):
+        self.hub = hub
+        return self
+
+    def stop(self):
+        pass
+
+    def describe(self) -> str:
+        return self.name
+
+
+class GPIOTrigger(TriggerSource):
+    """Tombol fisik di Jetson (falling edge, pull-up)."""
+    name = "gpio"
+
+    def __init__(self, pin: int = BUTTON_PIN):
+        self.pin = pin
+        self.GPIO = None
+
+    def start(self, hub):
+        super().start(hub)
+        import Jetson.GPIO as GPIO  # hanya ada di Jetson
+        self.GPIO = GPIO
+        GPIO.setmode(GPIO.BOARD)
+        GPIO.setup(self.pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        GPIO.add_event_detect(self.pin, GPIO.FALLING,
+                              callback=lambda channel: hub.fire(self.name), bouncetime=1)
+        return self
+
+    def stop(self):
+        if self.GPIO is not None:
+            self.GPIO.cleanup()
+
+    def describe(self):
+        return f"Tombol pada pin fisik {self.pin}. Tekan untuk proses."
+
+
+class KeyboardTrigger(TriggerSource):
+    """Enter (atau 'c') di terminal = trigger, 'q' = keluar."""
+    name = "keyboard"
+
+    def start(self, hub):
+        super().start(hub)
+        threading.Thread(target=self._run, name="KeyboardTrigger", daemon=True).start()
+        return self
+
+    def _run(self):
+        for line in sys.stdin:
+            cmd = line.strip().lower()
+            if cmd in ("q", "quit", "exit"):
+                self.hub.close()
+                return
+            if cmd in ("", "c", "capture"):
+                self.hub.fire(self.name)
+        self.hub.close()
+
+    def describe(self):
+        return "Tekan Enter (atau ketik 'c') untuk proses, 'q' untuk keluar."
+
+
+class SocketTrigger(TriggerSource):
+    """UNIX socket: setiap koneksi/baris yang masuk = satu trigger (mis. `echo | nc -U <path>`)."""
+    name = "socket"
+
+    def __init__(self, path: str = SOCKET_PATH):
+        self.path = path
+        self._sock = None
+
+    def start(self, hub):
+        super().start(hub)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(self.path)
+        self._sock.listen(4)
+        threading.Thread(target=self._run, name="SocketTrigger", daemon=True).start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            with conn:
+                self.hub.fire(self.name)
+
+    def stop(self):
+        if self._sock is not None:
+            self._sock.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def describe(self):
+        return f"Kirim koneksi ke UNIX socket {self.path} untuk proses."
+
+
+class ReplayTrigger(TriggerSource):
+    """
+    Trigger terjadwal untuk benchmark di luar device.
+    schedule: list jeda (detik) antar trigger, atau path file berisi satu jeda per baris.
+    """
+    name = "replay"
+
+    def __init__(self, schedule, close_when_done: bool = True):
+        if isinstance(schedule, str):
+            with open(schedule, encoding="utf-8") as f:
+                schedule = [float(x) for x in f.read().split() if x.strip()]
+        self.schedule = list(schedule)
+        self.close_when_done = close_when_done
+        self._stop = threading.Event()
+
+    def start(self, hub):
+        super().start(hub)
+        threading.Thread(target=self._run, name="ReplayTrigger", daemon=True).start()
+        return self
+
+    def _run(self):
+        for delay in self.schedule:
+            if self._stop.wait(delay):
+                return
+            self.hub.fire(self.name)
+        if self.close_when_done:
+            self.hub.close()
+
+    def stop(self):
+        self._stop.set()
+
+    def describe(self):
+        return f"Replay {len(self.schedule)} trigger terjadwal."
+
+
+def make_trigger(backend: str, pin: int = BUTTON_PIN, socket_path: str = SOCKET_PATH,
+                 replay=None) -> TriggerSource:
+    if backend == "gpio":
+        return GPIOTrigger(pin)
+    if backend == "keyboard":
+        return KeyboardTrigger()
+    if backend == "socket":
+        return SocketTrigger(socket_path)
+    if backend == "replay":
+        return ReplayTrigger(replay or [1.0])
+    raise ValueError(f"Input backend tidak dikenal: {backend} (pilih {', '.join(INPUT_BACKENDS)})")
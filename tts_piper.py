@@ -4,15 +4,30 @@
 
 import os
 import io
+import re
 import wave
+import queue
+import hashlib
 import tempfile
+import threading
 from typing import Optional
+import numpy as np
 from piper import SynthesisConfig, PiperVoice
 
+from cache_store import LRUCache
+
 # ===== KONFIGURASI =====
 PIPER_MODEL_PATH  = r"models\id_ID-news_tts-medium.onnx"
 PIPER_CONFIG_PATH = r"models\id_ID-news_tts-medium.onnx.json"
 
+# Cache PCM per kalimat (frasa tetap seperti "Tetap jaga jarak aman." tidak disintesis ulang)
+TTS_CACHE            = True
+TTS_CACHE_MAX_BYTES  = 32 * 1024 * 1024                  # batas LRU di memori
+TTS_CACHE_DIR        = None   # opt-in, mis. os.path.join("runs", "cache", "tts") -> klip .npy di disk
+TTS_DISK_MAX_BYTES   = 64 * 1024 * 1024                  # batas cache disk (file terlama dibuang)
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
 
 # ===== FUNGSI UTAMA =====
 def load_tts_model():
@@ -28,6 +43,7 @@ def load_tts_model():
 
     # Load model suara
     tts = PiperVoice.load(PIPER_MODEL_PATH, PIPER_CONFIG_PATH)
+    _limit_session_threads(tts)
 
     # Konfigurasi sintesis (atur volume, panjang, dan noise)
     cfg = SynthesisConfig(
@@ -41,6 +57,247 @@ def load_tts_model():
     return tts, cfg
 
 
+def _limit_session_threads(voice, intra_threads: Optional[int] = None):
+    """
+    Ganti session onnxruntime bawaan PiperVoice (thread pool = semua core) dengan session
+    ber-SessionOptions sesuai budget thread (resources.py).
+    """
+    from resources import engine_threads
+    n = intra_threads or engine_threads("piper")
+    if not n:
+        return  # tidak ada budget: biarkan session bawaan Piper
+    try:
+        import onnxruntime
+        from resources import onnx_session_options
+        voice.session = onnxruntime.InferenceSession(
+            PIPER_MODEL_PATH, sess_options=onnx_session_options(n), providers=["CPUExecutionProvider"])
+        print(f"[PiperTTS] onnxruntime intra-op threads: {n}")
+    except Exception as e:
+        print(f"[PiperTTS] Warning: session default dipakai ({e})")
+
+
+class PiperTTSEngine:
+    """
+    Engine TTS yang tetap resident: voice dan SynthesisConfig dimuat sekali,
+    lalu setiap kalimat disintesis langsung ke PCM int16 di memori (tanpa file temp).
+    """
+
+    def __init__(self):
+        self.voice, self.cfg = load_tts_model()
+        self.sample_rate = int(self.voice.config.sample_rate)
+        self.cache = PCMCache(self._config_tag()) if TTS_CACHE else None
+
+    def reset_cache(self, enabled: bool = True, cache_dir: Optional[str] = None):
+        """Ganti cache PCM dengan yang kosong (cache_dir None -> memori saja) atau matikan."""
+        self.cache = PCMCache(self._config_tag(), cache_dir=cache_dir) if enabled else None
+
+    def set_threads(self, intra_threads: int):
+        """Buat ulang session onnxruntime dengan jumlah thread lain (dipakai bench threads)."""
+        _limit_session_threads(self.voice, intra_threads)
+
+    def _config_tag(self) -> str:
+        """Identitas model + SynthesisConfig; bagian dari key cache."""
+        c = self.cfg
+        return (f"{os.path.basename(PIPER_MODEL_PATH)}|{self.sample_rate}|{c.volume}|"
+                f"{c.length_scale}|{c.noise_scale}|{c.noise_w_scale}|{c.normalize_audio}")
+
+    def synthesize_pcm(self, text_id: str) -> np.ndarray:
+        """
+        Sintesis teks -> PCM mono int16 (np.ndarray). Kosong jika teks kosong.
+        Dengan cache aktif, teks dipecah per kalimat; kalimat yang sudah pernah
+        disintesis diambil dari cache lalu digabung dengan klip baru.
+        """
+        if not text_id.strip():
+            return np.zeros(0, dtype=np.int16)
+        if self.cache is None:
+            return self._synthesize_raw(text_id)
+        clips = []
+        for sentence in _SENTENCE_SPLIT.split(text_id.strip()):
+            key = " ".join(sentence.split())
+            if not key:
+                continue
+            pcm = self.cache.get(key)
+            if pcm is None:
+                pcm = self._synthesize_raw(key)
+                self.cache.put(key, pcm)
+            if pcm.size:
+                clips.append(pcm)
+        if not clips:
+            return np.zeros(0, dtype=np.int16)
+        return np.asarray(clips[0]) if len(clips) == 1 else np.concatenate(clips)
+
+    def _synthesize_raw(self, text_id: str) -> np.ndarray:
+        """Sintesis langsung lewat Piper (tanpa cache)."""
+        chunks = [c.audio_int16_array for c in self.voice.synthesize(text_id, syn_config=self.cfg)]
+        if not chunks:
+            return np.zeros(0, dtype=np.int16)
+        return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+
+    def synthesize_bytes(self, text_id: str) -> bytes:
+        """Sintesis teks -> PCM int16 mentah (bytes, little-endian)."""
+        return self.synthesize_pcm(text_id).tobytes()
+
+    def write_wav(self, pcm: np.ndarray, output_wav_path: str) -> str:
+        """Tulis PCM ke file WAV (output samping, opsional)."""
+        write_wav(pcm, output_wav_path, self.sample_rate)
+        return output_wav_path
+
+
+class PCMCache:
+    """
+    Cache PCM per kalimat: LRU dibatasi byte di memori, plus file .npy opsional di disk
+    yang dibaca dengan mmap (klip tidak disalin ke RAM sampai dipakai).
+    Key = kalimat ternormalisasi + tag konfigurasi sintesis.
+
+    Cache disk dibatasi `disk_max_bytes` (LRU menurut mtime; hit disk memperbarui mtime)
+    dan ditulis oleh thread latar belakang, jadi np.save tidak ada di jalur sintesis.
+    """
+
+    def __init__(self, config_tag: str, max_bytes: int = TTS_CACHE_MAX_BYTES,
+                 cache_dir: Optional[str] = TTS_CACHE_DIR, disk_max_bytes: int = TTS_DISK_MAX_BYTES):
+        self.config_tag = config_tag
+        self.lru = LRUCache(maxsize=None, max_bytes=max_bytes, sizeof=lambda a: a.nbytes)
+        self.cache_dir = cache_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+        self._disk_bytes = 0
+        self._writes = queue.Queue(maxsize=64)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+            self._evict_disk()
+            threading.Thread(target=self._writer, name="tts-cache-writer", daemon=True).start()
+
+    def _path(self, sentence: str) -> str:
+        digest = hashlib.sha1(f"{self.config_tag}|{sentence}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.npy")
+
+    def get(self, sentence: str):
+        pcm = self.lru.get(sentence)
+        if pcm is None and self.cache_dir:
+            path = self._path(sentence)
+            if os.path.exists(path):
+                try:
+                    pcm = np.load(path, mmap_mode="r")
+                    os.utime(path)   # tandai baru dipakai (urutan eviction)
+                    self.disk_hits += 1
+                    self.lru.put(sentence, pcm)
+                except (OSError, ValueError) as e:
+                    print(f"[PiperTTS] Warning: cache rusak {path}: {e}")
+                    pcm = None
+        if pcm is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return pcm
+
+    def put(self, sentence: str, pcm: np.ndarray):
+        self.lru.put(sentence, pcm)
+        if self.cache_dir and pcm.size:
+            try:
+                self._writes.put_nowait((self._path(sentence), pcm))
+            except queue.Full:
+                pass  # disk lambat: klip ini cukup di LRU memori
+
+    def flush(self):
+        """Tunggu semua tulisan disk yang masih antre selesai."""
+        if self.cache_dir:
+            self._writes.join()
+
+    def _writer(self):
+        while True:
+            path, pcm = self._writes.get()
+            tmp = path + ".tmp.npy"
+            try:
+                existed = os.path.exists(path)
+                np.save(tmp, pcm)
+                os.replace(tmp, path)
+                if not existed:
+                    self._disk_bytes += os.path.getsize(path)
+                    if self._disk_bytes > self.disk_max_bytes:
+                        self._evict_disk()
+            except OSError as e:
+                print(f"[PiperTTS] Warning: gagal menyimpan cache: {e}")
+            finally:
+                self._writes.task_done()
+
+    def _disk_entries(self) -> list:
+        """(path, ukuran, mtime) semua klip .npy di cache_dir."""
+        out = []
+        with os.scandir(self.cache_dir) as it:
+            for e in it:
+                if e.name.endswith(".npy") and not e.name.endswith(".tmp.npy"):
+                    st = e.stat()
+                    out.append((e.path, st.st_size, st.st_mtime))
+        return out
+
+    def _evict_disk(self):
+        """Buang klip terlama sampai total <= disk_max_bytes."""
+        entries = sorted(self._disk_entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # mis. masih di-mmap (Windows)
+            total -= size
+            self.disk_evictions += 1
+        self._disk_bytes = total
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return dict(self.lru.stats(), hits=self.hits, disk_hits=self.disk_hits, misses=self.misses,
+                    disk_bytes=self._disk_bytes, disk_evictions=self.disk_evictions,
+                    hit_rate=round(self.hits / total, 3) if total else 0.0)
+
+
+def pcm_to_wav_bytes(pcm: np.ndarray, sample_rate: int) -> bytes:
+    """Bungkus PCM jadi WAV di memori (dipakai winsound.SND_MEMORY)."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+
+def write_wav(pcm: np.ndarray, output_wav_path: str, sample_rate: int):
+    with open(output_wav_path, "wb") as f:
+        f.write(pcm_to_wav_bytes(pcm, sample_rate))
+
+
+def get_tts_engine() -> PiperTTSEngine:
+    """Engine TTS resident dari model pool."""
+    from model_pool import get_pool
+    return get_pool().get("piper")
+
+
+def tts_cache_stats() -> dict:
+    """Statistik cache PCM engine resident (kosong jika cache dimatikan)."""
+    cache = get_tts_engine().cache
+    return cache.stats() if cache is not None else {}
+
+
+def synthesize_id(text_id: str, output_wav_path: Optional[str] = None):
+    """
+    Sintesis teks Indonesia ke PCM di memori.
+
+    Return:
+        (pcm int16 np.ndarray, sample_rate). WAV hanya ditulis jika output_wav_path diisi.
+    """
+    engine = get_tts_engine()
+    pcm = engine.synthesize_pcm(text_id)
+    if output_wav_path and pcm.size:
+        engine.write_wav(pcm, output_wav_path)
+    return pcm, engine.sample_rate
+
+
 def tts_piper_to_wav(
     text_id: str,
     output_wav_path: Optional[str] = None,
@@ -49,7 +306,7 @@ def tts_piper_to_wav(
     """
     text_id         : Teks bahasa Indonesia yang akan dibacakan.
     output_wav_path : Path file .wav tujuan. Jika None -> dibuat file temp.
-    sample_rate     : Sample rate output (default 22050).
+    sample_rate     : Tidak dipakai lagi (sample rate mengikuti voice), disimpan demi kompatibilitas.
 
     Return:
         path file WAV (string) jika sukses, None jika gagal.
@@ -58,9 +315,9 @@ def tts_piper_to_wav(
         print("[PiperTTS] Warning: teks kosong, tidak ada audio dibuat.")
         return None
 
-    # Load TTS model
+    # Ambil engine TTS resident dari pool (dimuat sekali per proses)
     try:
-        tts, cfg = load_tts_model()
+        engine = get_tts_engine()
     except Exception as e:
         print(f"[PiperTTS] Gagal memuat model: {e}")
         return None
@@ -71,17 +328,9 @@ def tts_piper_to_wav(
         os.close(fd)
         output_wav_path = tmp_path
 
-    # Synthesize ke bytes buffer
+    # Synthesize langsung ke file .wav
     try:
-        buf = io.BytesIO()
-        with wave.open(buf, "wb") as wav:
-            tts.synthesize_wav(text_id, wav, syn_config=cfg)
-        wav_bytes = buf.getvalue()
-
-        # Simpan ke file .wav
-        with open(output_wav_path, "wb") as f:
-            f.write(wav_bytes)
-
+        engine.write_wav(engine.synthesize_pcm(text_id), output_wav_path)
         print(f"[PiperTTS] Audio berhasil dibuat: {output_wav_path}")
         return output_wav_path
 
@@ -90,18 +339,32 @@ def tts_piper_to_wav(
         return None
 
 
-def speak_id(text_id: str):
+def play_pcm(pcm: np.ndarray, sample_rate: int):
+    """Putar PCM dari memori (Windows/winsound). Di OS lain tidak melakukan apa-apa."""
+    if os.name != "nt" or not pcm.size:
+        return
+    try:
+        import winsound
+        winsound.PlaySound(pcm_to_wav_bytes(pcm, sample_rate), winsound.SND_MEMORY)
+    except Exception as e:
+        print(f"[PiperTTS] Tidak bisa memutar otomatis: {e}")
+
+
+def speak_id(text_id: str, output_wav_path: Optional[str] = None):
     """
-    Buat audio dari teks Indonesia dan coba putar (Windows). Mengembalikan path WAV atau None.
+    Buat audio dari teks Indonesia di memori dan coba putar (Windows).
+    Mengembalikan (pcm, sample_rate); WAV hanya disimpan jika output_wav_path diisi.
     """
-    wav_path = tts_piper_to_wav(text_id)
-    if wav_path and os.name == "nt":
-        try:
-            import winsound
-            winsound.PlaySound(wav_path, winsound.SND_FILENAME)
-        except Exception as e:
-            print(f"[PiperTTS] Tidak bisa memutar otomatis: {e}. Path file: {wav_path}")
-    return wav_path
+    if not text_id.strip():
+        print("[PiperTTS] Warning: teks kosong, tidak ada audio dibuat.")
+        return np.zeros(0, dtype=np.int16), 0
+    try:
+        pcm, sr = synthesize_id(text_id, output_wav_path)
+    except Exception as e:
+        print(f"[PiperTTS] Error saat membuat audio: {e}")
+        return np.zeros(0, dtype=np.int16), 0
+    play_pcm(pcm, sr)
+    return pcm, sr
 
 
 # ===== TEST MANUAL =====
@@ -113,11 +376,5 @@ if __name__ == "__main__":
     )
 
     print("=== Tes Piper TTS (Bahasa Indonesia) ===")
-    out_path = tts_piper_to_wav(contoh_teks)
-    if out_path:
-        print("Output WAV:", out_path)
-        try:
-            import winsound
-            winsound.PlaySound(out_path, winsound.SND_FILENAME)
-        except Exception as e:
-            print(f"⚠ Tidak dapat memutar suara otomatis: {e}")
+    pcm, sr = speak_id(contoh_teks)
+    print(f"PCM: {pcm.size} sampel @ {sr} Hz ({pcm.size / max(1, sr):.2f}s)")
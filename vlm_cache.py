@@ -0,0 +1,127 @@
+# vlm_cache.py
+# Cache jawaban Moondream berbasis isi adegan: perceptual hash gambar tersegmentasi +
+# fingerprint terkuantisasi dari daftar objek segment_objects. Kalau pengguna tidak bergerak
+# dan adegannya sama, tahap VLM (tahap terbesar) dilewati.
+
+import os
+import threading
+import cv2
+import numpy as np
+
+from cache_store import LRUCache, SqliteKV
+
+# ====== KONFIG ======
+CACHE_SIZE   = 128
+CACHE_TTL    = 600           # detik
+MAX_DISTANCE = 6             # jarak Hamming maksimum pHash (dari 64 bit) untuk dianggap sama
+BBOX_GRID    = 64            # kuantisasi bbox (piksel frame)
+CACHE_DB     = os.path.join("runs", "cache", "vlm_cache.sqlite")
+
+
+def phash(img) -> int:
+    """Perceptual hash 64-bit (DCT 32x32 -> 8x8 frekuensi rendah, dibanding median)."""
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    bits = low > np.median(low[1:])
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def object_fingerprint(objects: list, grid: int = BBOX_GRID) -> str:
+    """Fingerprint urutan-bebas dari objek: posisi (h/v) + bbox terkuantisasi."""
+    parts = []
+    for obj in objects:
+        x1, y1, x2, y2 = (int(v) // grid for v in obj["bbox"])
+        parts.append(f"{obj['h_position']}-{obj['v_position']}:{x1},{y1},{x2},{y2}")
+    return ";".join(sorted(parts))
+
+
+class VLMCache:
+    """
+    LRU/TTL cache jawaban VLM. Key = (fingerprint objek, pHash gambar).
+
+    Lookup: fingerprint harus sama persis, pHash boleh berbeda sampai `max_distance` bit.
+    Jika `db_path` diisi, entri juga disimpan di SQLite dan dimuat ulang saat startup.
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE, ttl: float = CACHE_TTL,
+                 max_distance: int = MAX_DISTANCE, db_path: str = CACHE_DB):
+        self.lru = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.max_distance = max_distance
+        self.ttl = ttl
+        # Hanya `maxsize` entri terbaru dalam TTL yang dimuat ulang; sisanya dipangkas dari disk
+        self.db = SqliteKV(db_path, "vlm_responses", max_rows=maxsize, max_age=ttl) if db_path else None
+        if self.db is not None:
+            for key, value, created in reversed(self.db.items(limit=maxsize, max_age=ttl)):
+                self.lru.put(self._parse(key), value, stamp=created)
+
+    @staticmethod
+    def _key_str(key) -> str:
+        fp, h = key
+        return f"{h:016x}|{fp}"
+
+    @staticmethod
+    def _parse(key_str: str):
+        h, fp = key_str.split("|", 1)
+        return fp, int(h, 16)
+
+    def make_key(self, img, objects: list):
+        return object_fingerprint(objects), phash(img)
+
+    def lookup(self, img, objects: list):
+        """
+        Cari jawaban untuk adegan ini.
+
+        Returns:
+            (teks atau None, key) — key dipakai untuk store() kalau miss.
+        """
+        key = self.make_key(img, objects)
+        text = self.lru.get(key)
+        if text is None:
+            fp, h = key
+            best = None
+            for (fp2, h2), _ in self.lru.items():
+                if fp2 != fp:
+                    continue
+                d = hamming(h, h2)
+                if d <= self.max_distance and (best is None or d < best[0]):
+                    best = (d, (fp2, h2))
+            if best is not None:
+                # Hit mirip: get() juga menyegarkan posisi entri aslinya di LRU
+                text = self.lru.get(best[1])
+        if text is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return text, key
+
+    def store(self, key, text: str):
+        if not text:
+            return
+        self.lru.put(key, text)
+        if self.db is not None:
+            self.db.put(self._key_str(key), text)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return dict(self.lru.stats(), hits=self.hits, misses=self.misses,
+                    hit_rate=round(self.hits / total, 3) if total else 0.0)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_vlm_cache() -> VLMCache:
+    """Cache global (dipakai bersama oleh thread tahap executor)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = VLMCache()
+        return _cache
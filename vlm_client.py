@@ -0,0 +1,137 @@
+# vlm_client.py
+# Client Ollama yang reuse koneksi (requests.Session, keep-alive HTTP) dan menahan model
+# tetap resident di Ollama lewat `keep_alive`, plus warm-up saat startup dan health check.
+
+import json
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# ====== KONFIG ======
+OLLAMA_HOST = "http://localhost:11434"
+KEEP_ALIVE  = -1      # -1 = model tidak pernah di-evict Ollama; bisa juga "30m"
+TIMEOUT     = 120
+
+
+def _tiny_image_b64() -> str:
+    """Gambar hitam 32x32 (PNG, base64) untuk warm-up vision encoder."""
+    import base64
+    import cv2
+    import numpy as np
+    ok, buf = cv2.imencode(".png", np.zeros((32, 32, 3), dtype=np.uint8))
+    return base64.b64encode(buf).decode("utf-8")
+
+
+class OllamaClient:
+    """Client Ollama dengan connection pooling, keep_alive, warm-up, dan health check."""
+
+    def __init__(self, host: str = OLLAMA_HOST, keep_alive=KEEP_ALIVE, timeout: float = TIMEOUT):
+        self.host = host.rstrip("/")
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _url(self, path: str) -> str:
+        return f"{self.host}{path}"
+
+    def _with_keep_alive(self, payload: dict) -> dict:
+        if "keep_alive" not in payload:
+            payload = dict(payload, keep_alive=self.keep_alive)
+        return payload
+
+    def generate(self, payload: dict) -> dict:
+        """POST /api/generate (non-stream), return JSON respons."""
+        resp = self.session.post(self._url("/api/generate"),
+                                 json=self._with_keep_alive(dict(payload, stream=False)),
+                                 timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    def generate_stream(self, payload: dict):
+        """POST /api/generate (stream), yield setiap baris NDJSON sebagai dict."""
+        with self.session.post(self._url("/api/generate"),
+                               json=self._with_keep_alive(dict(payload, stream=True)),
+                               timeout=self.timeout, stream=True) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(data["error"])
+                yield data
+                if data.get("done"):
+                    break
+
+    def preload(self, model: str) -> float:
+        """Muat model ke memori Ollama tanpa generate (prompt kosong). Return durasi (detik)."""
+        t0 = time.perf_counter()
+        resp = self.session.post(self._url("/api/generate"),
+                                 json={"model": model, "keep_alive": self.keep_alive, "stream": False},
+                                 timeout=self.timeout)
+        resp.raise_for_status()
+        return time.perf_counter() - t0
+
+    def warmup(self, model: str) -> float:
+        """Preload + satu request kecil dengan gambar, supaya vision encoder juga sudah panas."""
+        t0 = time.perf_counter()
+        self.preload(model)
+        self.generate({
+            "model": model,
+            "prompt": "Describe.",
+            "images": [_tiny_image_b64()],
+            "options": {"num_predict": 1},
+        })
+        dt = time.perf_counter() - t0
+        print(f"[Ollama] Warm-up {model}: {dt:.3f}s")
+        return dt
+
+    def health(self, model: str = None) -> dict:
+        """
+        Status server dan model.
+
+        Returns:
+            dict: server (bool), version, model_loaded (bool, jika model diisi), expires_at
+        """
+        info = {"server": False, "version": None, "model_loaded": False, "expires_at": None}
+        try:
+            resp = self.session.get(self._url("/api/version"), timeout=2)
+            resp.raise_for_status()
+            info["server"] = True
+            info["version"] = resp.json().get("version")
+            if model:
+                resp = self.session.get(self._url("/api/ps"), timeout=2)
+                resp.raise_for_status()
+                for m in resp.json().get("models", []):
+                    if m.get("name") == model or m.get("model") == model:
+                        info["model_loaded"] = True
+                        info["expires_at"] = m.get("expires_at")
+                        break
+        except (requests.RequestException, ValueError) as e:
+            info["error"] = str(e)
+        return info
+
+    def is_ready(self, model: str) -> bool:
+        """True jika server hidup dan model sudah resident."""
+        h = self.health(model)
+        return h["server"] and h["model_loaded"]
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OllamaClient:
+    """Client global (satu Session untuk seluruh proses)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OllamaClient()
+        return _client